@@ -0,0 +1,216 @@
+from django.conf import settings
+import json
+import math
+import os
+import re
+import threading
+import time
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from .query_plan import QueryPlanCache
+
+logger = logging.getLogger(__name__)
+
+# (min_lon, min_lat, max_lon, max_lat)
+BBox = Tuple[float, float, float, float]
+# Outer ring followed by holes, each a list of (lon, lat) points
+Polygon = List[List[Tuple[float, float]]]
+
+
+class Area(NamedTuple):
+    """A named neighbourhood made of one or more polygons"""
+    id: str
+    name: str
+    aliases: Tuple[str, ...]
+    polygons: Tuple[Polygon, ...]
+    bbox: BBox
+
+    @property
+    def center(self) -> Tuple[float, float]:
+        """(lat, lon) of the bounding box centre"""
+        return (self.bbox[1] + self.bbox[3]) / 2, (self.bbox[0] + self.bbox[2]) / 2
+
+
+def _ring_contains(ring: Sequence[Tuple[float, float]], lon: float, lat: float) -> bool:
+    """Even-odd ray casting test"""
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def _polygon_contains(polygon: Polygon, lon: float, lat: float) -> bool:
+    return _ring_contains(polygon[0], lon, lat) and not any(_ring_contains(hole, lon, lat) for hole in polygon[1:])
+
+
+def _bbox_of(points: Sequence[Tuple[float, float]]) -> BBox:
+    lons = [p[0] for p in points]
+    lats = [p[1] for p in points]
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def _union(boxes: Sequence[BBox]) -> BBox:
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+class AreaIndex:
+    """Neighbourhood polygons from a GeoJSON file behind an STR-packed R-tree.
+
+    Each polygon's bounding box is a leaf entry; leaves are packed by
+    sort-tile-recursive into nodes of ``NODE_CAPACITY`` boxes, so resolving a
+    coordinate only visits the few nodes whose boxes contain it before running
+    the exact point-in-polygon test.
+    Features need an ``id`` (or ``properties.id``) and ``properties.name``;
+    optional ``properties.aliases`` lists other spellings used in messages.
+    """
+
+    NODE_CAPACITY = 8
+
+    def __init__(self, features: List[Dict]):
+        self.areas: Dict[str, Area] = {}
+        entries: List[Tuple[BBox, object]] = []  # leaf entries: (bbox, (area id, polygon))
+
+        for feature in features:
+            props = feature.get('properties') or {}
+            geometry = feature.get('geometry') or {}
+            area_id = str(feature.get('id') or props.get('id') or props['name']).lower()
+            if geometry.get('type') == 'Polygon':
+                rings = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                rings = geometry['coordinates']
+            else:
+                logger.error(f"Skipping area {area_id}: unsupported geometry {geometry.get('type')}")
+                continue
+
+            polygons = tuple([[(float(x), float(y)) for x, y, *_ in ring] for ring in polygon] for polygon in rings)
+            for polygon in polygons:
+                entries.append((_bbox_of(polygon[0]), (area_id, polygon)))
+            aliases = tuple(alias.lower() for alias in props.get('aliases', []))
+            self.areas[area_id] = Area(area_id, props['name'], aliases, polygons,
+                                       _union([_bbox_of(polygon[0]) for polygon in polygons]))
+
+        # Nodes are (bbox, children, is_leaf); leaf children are the entries above
+        self.root = self._pack(entries) if entries else None
+
+        names = {}
+        for area in self.areas.values():
+            for name in (area.name.lower(),) + area.aliases:
+                names[name] = area.id
+        self._names = names
+        # Longest names first so "old dhaka" wins over "dhaka"
+        self._name_pattern = re.compile(
+            r'\b(' + '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True)) + r')\b'
+        ) if names else None
+
+    @classmethod
+    def _pack(cls, entries: List[Tuple[BBox, object]]) -> Tuple[BBox, List, bool]:
+        """Sort-tile-recursive bulk load, returning the root node"""
+        level = entries
+        is_leaf = True
+        while True:
+            nodes = []
+            size = cls.NODE_CAPACITY
+            slice_count = max(1, math.ceil(math.sqrt(math.ceil(len(level) / size))))
+            by_x = sorted(level, key=lambda e: e[0][0] + e[0][2])
+            slice_size = math.ceil(len(level) / slice_count)
+            for s in range(0, len(by_x), slice_size):
+                by_y = sorted(by_x[s:s + slice_size], key=lambda e: e[0][1] + e[0][3])
+                for n in range(0, len(by_y), size):
+                    children = by_y[n:n + size]
+                    nodes.append((_union([c[0] for c in children]), children, is_leaf))
+            if len(nodes) == 1:
+                return nodes[0]
+            level = [(bbox, (bbox, children, leaf)) for bbox, children, leaf in nodes]
+            is_leaf = False
+
+    def locate(self, lat: float, lon: float) -> Optional[Area]:
+        """The area containing a coordinate, if any"""
+        if self.root is None:
+            return None
+        stack = [self.root]
+        while stack:
+            bbox, children, leaf = stack.pop()
+            for child_bbox, payload in children:
+                if not (child_bbox[0] <= lon <= child_bbox[2] and child_bbox[1] <= lat <= child_bbox[3]):
+                    continue
+                if leaf:
+                    area_id, polygon = payload
+                    if _polygon_contains(polygon, lon, lat):
+                        return self.areas[area_id]
+                else:
+                    stack.append(payload)
+        return None
+
+    def area_id(self, lat: float, lon: float) -> Optional[str]:
+        """Id of the area containing a coordinate; a cheap cache-partition key"""
+        area = self.locate(lat, lon)
+        return area.id if area else None
+
+    def contains(self, area_id: str, lat: float, lon: float) -> bool:
+        area = self.areas.get(area_id)
+        if area is None:
+            return False
+        if not (area.bbox[0] <= lon <= area.bbox[2] and area.bbox[1] <= lat <= area.bbox[3]):
+            return False
+        return any(_polygon_contains(polygon, lon, lat) for polygon in area.polygons)
+
+    def find_in_message(self, message: str) -> Optional[Area]:
+        """The first area named in a (cleaned, lower-case) message"""
+        if self._name_pattern is None:
+            return None
+        match = self._name_pattern.search(message)
+        return self.areas[self._names[match.group(1)]] if match else None
+
+    def vocabulary(self) -> List[str]:
+        """Words of all area names and aliases, so spelling correction keeps them"""
+        return [word for name in self._names for word in name.split()]
+
+    _current: Optional['AreaIndex'] = None
+    _file_id: Optional[Tuple] = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def current(cls) -> Optional['AreaIndex']:
+        """The configured areas, reloaded when the GeoJSON file changes"""
+        path = getattr(settings, 'CHATBOT_AREAS_FILE', None)
+        if not path:
+            return None
+
+        now = time.monotonic()
+        interval = getattr(settings, 'CHATBOT_AREAS_CHECK_INTERVAL', 5.0)
+        if now - cls._checked_at < interval:
+            return cls._current
+
+        with cls._lock:
+            cls._checked_at = now
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                cls._current = cls._file_id = None
+                return None
+            file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if cls._file_id != file_id:
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        index = cls(json.load(f).get('features', []))
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.error(f"Error loading areas from {path}: {e}")
+                    return cls._current
+                if cls._current is not None:
+                    # Cached message plans carry area ids from the old file
+                    QueryPlanCache.invalidate()
+                cls._current = index
+                cls._file_id = file_id
+                logger.info(f"Loaded {len(index.areas)} areas from {path}")
+            return cls._current
+
+    @classmethod
+    def stamp(cls) -> Optional[Tuple]:
+        """Identity of the loaded file, for keying caches derived from areas"""
+        cls.current()
+        return cls._file_id
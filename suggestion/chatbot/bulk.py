@@ -0,0 +1,129 @@
+"""Worker-side helpers for the bulk_recommend management command.
+
+Kept free of model and view imports so pool workers can load it without
+setting up Django.
+"""
+import csv
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .place_store import PlaceStore
+from .sharding import ShardRouter
+
+_router: Optional[ShardRouter] = None
+_limit = 5
+
+
+def init_worker(places: Optional[List], store_path: Optional[str], precision: int, limit: int) -> None:
+    """Build the place index once, before any rows arrive.
+
+    Runs in the parent before forking workers, or in each spawned worker.
+    """
+    global _router, _limit
+    if store_path:
+        # Every worker maps the same file, so the coordinates are shared via the page cache
+        places = PlaceStore(store_path).iter_places()
+    _router = ShardRouter(places, precision)
+    _limit = limit
+
+
+def recommend_chunk(rows: List[Dict]) -> List[Dict]:
+    """Nearest places for a batch of (id, lat, lon, category) rows"""
+    results = []
+    for row in rows:
+        if 'parse_error' in row:
+            # Unparsable input line, reported in place of its results
+            results.append({"id": None, "error": row['parse_error']})
+            continue
+        try:
+            lat = float(row['lat'])
+            lon = float(row['lon'])
+            if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+                raise ValueError("coordinates out of range")
+        except (KeyError, TypeError, ValueError) as e:
+            results.append({"id": row.get('id'), "error": f"invalid location: {e}"})
+            continue
+
+        hits = _router.top_k(lat, lon, _limit, row.get('category') or None)
+        results.append({
+            "id": row.get('id'),
+            "places": [{
+                "id": place.pk,
+                "name": place.name,
+                "category": place.category or "General",
+                "distance_km": round(dist, 2)
+            } for dist, place in hits]
+        })
+    return results
+
+
+def read_rows(stream, fmt: str) -> Iterator[Dict]:
+    """Lazily parse input rows from a CSV (with header) or NDJSON stream.
+
+    Lines that cannot be parsed become ``{"parse_error": ...}`` rows naming
+    the line, so one bad line does not abort a long run.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield {"parse_error": f"line {reader.line_num}: invalid CSV: {e}"}
+                continue
+            yield {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+    else:
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield {"parse_error": f"line {number}: invalid JSON: {e}"}
+                continue
+            if not isinstance(row, dict):
+                yield {"parse_error": f"line {number}: expected a JSON object"}
+                continue
+            yield row
+
+
+def chunked(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ResultWriter:
+    """Writes recommendation results as NDJSON or as one CSV row per recommended place"""
+
+    CSV_FIELDS = ['id', 'rank', 'place_id', 'name', 'category', 'distance_km', 'error']
+
+    def __init__(self, stream, fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.csv = csv.writer(stream)
+            self.csv.writerow(self.CSV_FIELDS)
+
+    def write(self, results: List[Dict]) -> Tuple[int, int]:
+        """Write a batch and return (rows written, rows with errors)"""
+        errors = 0
+        for result in results:
+            if 'error' in result:
+                errors += 1
+            if self.fmt != 'csv':
+                self.stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+            elif 'error' in result:
+                self.csv.writerow([result['id'], '', '', '', '', '', result['error']])
+            else:
+                for rank, place in enumerate(result['places'], start=1):
+                    self.csv.writerow([result['id'], rank, place['id'], place['name'],
+                                       place['category'], place['distance_km'], ''])
+        return len(results), errors
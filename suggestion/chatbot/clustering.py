@@ -0,0 +1,190 @@
+from django.conf import settings
+from collections import Counter
+import math
+import threading
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .place_store import StoredPlace
+
+logger = logging.getLogger(__name__)
+
+MAX_MERCATOR_LAT = 85.05112878
+
+Cell = Tuple[int, int]
+
+
+class ClusterCell:
+    """Pre-aggregated places of one grid cell at one zoom level"""
+    __slots__ = ('count', 'sum_lat', 'sum_lon', 'categories', 'place')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lon = 0.0
+        self.categories: Counter = Counter()
+        self.place: Optional[StoredPlace] = None  # the only member while count == 1
+
+    def add_place(self, place: StoredPlace) -> None:
+        self.count += 1
+        self.sum_lat += place.latitude
+        self.sum_lon += place.longitude
+        self.categories[place.category or "General"] += 1
+        self.place = place if self.count == 1 else None
+
+    def merge(self, other: 'ClusterCell') -> None:
+        self.place = other.place if self.count == 0 else None
+        self.count += other.count
+        self.sum_lat += other.sum_lat
+        self.sum_lon += other.sum_lon
+        self.categories.update(other.categories)
+
+
+class ClusterIndex:
+    """Hierarchical grid of place clusters for map rendering.
+
+    At zoom z the world is split into 2^(z + CHATBOT_CLUSTER_GRID_BITS) Web
+    Mercator cells per axis, i.e. square cells of a fixed on-screen size. The
+    finest level is built from the places; each coarser level merges four
+    child cells. A viewport query only touches the cells it covers, so the
+    response size depends on the screen, not on the number of places.
+    """
+
+    def __init__(self, places: Iterable, max_zoom: int = 16, grid_bits: int = 2):
+        self.max_zoom = max_zoom
+        self.grid_bits = grid_bits
+        self.levels: List[Dict[Cell, ClusterCell]] = [{} for _ in range(max_zoom + 1)]
+        self.members: Dict[Cell, List[StoredPlace]] = {}
+
+        finest = self.levels[max_zoom]
+        for p in places:
+            place = StoredPlace(p.pk, p.name, p.category, p.latitude, p.longitude, p.rating)
+            cell = self.cell_of(place.latitude, place.longitude, max_zoom)
+            finest.setdefault(cell, ClusterCell()).add_place(place)
+            self.members.setdefault(cell, []).append(place)
+
+        for zoom in range(max_zoom, 0, -1):
+            parent_level = self.levels[zoom - 1]
+            for (x, y), cell in self.levels[zoom].items():
+                parent_level.setdefault((x >> 1, y >> 1), ClusterCell()).merge(cell)
+
+    def cells_per_axis(self, zoom: int) -> int:
+        return 1 << (zoom + self.grid_bits)
+
+    @staticmethod
+    def _mercator(lat: float, lon: float) -> Tuple[float, float]:
+        """Project to Web Mercator coordinates in [0, 1)"""
+        lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+        x = (lon + 180.0) / 360.0
+        sin_lat = math.sin(math.radians(lat))
+        y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+        return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+    def cell_of(self, lat: float, lon: float, zoom: int) -> Cell:
+        x, y = self._mercator(lat, lon)
+        n = self.cells_per_axis(zoom)
+        return int(x * n), int(y * n)
+
+    def _cell_ranges(self, bbox: Tuple[float, float, float, float],
+                     zoom: int) -> Iterator[Tuple[int, int, int, int]]:
+        """(x0, y0, x1, y1) cell ranges covering a (min_lon, min_lat, max_lon, max_lat) box"""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        # Boxes crossing the antimeridian are split in two
+        spans = [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+        for west, east in spans:
+            x0, y0 = self.cell_of(max_lat, west, zoom)
+            x1, y1 = self.cell_of(min_lat, east, zoom)
+            yield x0, y0, x1, y1
+
+    def clamp_zoom(self, bbox: Tuple[float, float, float, float], zoom: int, max_items: int) -> int:
+        """Deepest zoom, up to the requested one, at which a box spans at most max_items cells"""
+        while zoom > 0 and sum((x1 - x0 + 1) * (y1 - y0 + 1)
+                               for x0, y0, x1, y1 in self._cell_ranges(bbox, zoom)) > max_items:
+            zoom -= 1
+        return zoom
+
+    def _cells_in(self, level: Dict[Cell, ClusterCell], zoom: int,
+                  bbox: Tuple[float, float, float, float]) -> Iterator[Cell]:
+        """Occupied cells of a level inside a (min_lon, min_lat, max_lon, max_lat) box"""
+        for x0, y0, x1, y1 in self._cell_ranges(bbox, zoom):
+            if (x1 - x0 + 1) * (y1 - y0 + 1) > len(level):
+                # Box covers more cells than are occupied: filter the occupied ones
+                for x, y in level:
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        yield x, y
+            else:
+                for x in range(x0, x1 + 1):
+                    for y in range(y0, y1 + 1):
+                        if (x, y) in level:
+                            yield x, y
+
+    def query(self, bbox: Tuple[float, float, float, float], zoom: int,
+              max_items: Optional[int] = None) -> List[Dict]:
+        """Clusters (or single places) visible in a viewport at a zoom level.
+
+        With ``max_items``, viewports too large for the zoom are answered at a
+        coarser zoom, and places too dense to list are returned as clusters, so
+        at most max_items items come back whatever the number of places.
+        """
+        if max_items is not None:
+            zoom = self.clamp_zoom(bbox, zoom, max_items)
+        if zoom > self.max_zoom:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            crosses = min_lon > max_lon
+            places = []
+            for cell in self._cells_in(self.levels[self.max_zoom], self.max_zoom, bbox):
+                for place in self.members[cell]:
+                    in_lon = (place.longitude >= min_lon or place.longitude <= max_lon) if crosses \
+                        else min_lon <= place.longitude <= max_lon
+                    if in_lon and min_lat <= place.latitude <= max_lat:
+                        places.append(self._place_item(place))
+            if max_items is None or len(places) <= max_items:
+                return places
+            # Too many places to list one by one; the finest clusters span fewer cells than the viewport
+            zoom = self.max_zoom
+
+        zoom = max(zoom, 0)
+        level = self.levels[zoom]
+        items = []
+        for cell_key in self._cells_in(level, zoom, bbox):
+            cell = level[cell_key]
+            if cell.count == 1:
+                items.append(self._place_item(cell.place))
+            else:
+                items.append({
+                    "type": "cluster",
+                    "count": cell.count,
+                    "latitude": round(cell.sum_lat / cell.count, 6),
+                    "longitude": round(cell.sum_lon / cell.count, 6),
+                    "category": cell.categories.most_common(1)[0][0]
+                })
+        return items
+
+    @staticmethod
+    def _place_item(place: StoredPlace) -> Dict:
+        return {
+            "type": "place",
+            "count": 1,
+            "id": place.pk,
+            "name": place.name,
+            "category": place.category or "General",
+            "latitude": place.latitude,
+            "longitude": place.longitude,
+            "rating": place.rating
+        }
+
+    _current: Optional['ClusterIndex'] = None
+    _source: Optional[object] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def current(cls, source_version: object, load_places) -> 'ClusterIndex':
+        """Process-wide index, rebuilt when the place source changes"""
+        max_zoom = getattr(settings, 'CHATBOT_CLUSTER_MAX_ZOOM', 16)
+        grid_bits = getattr(settings, 'CHATBOT_CLUSTER_GRID_BITS', 2)
+        with cls._lock:
+            source = (source_version, max_zoom, grid_bits)
+            if cls._current is None or cls._source != source:
+                cls._current = cls(load_places(), max_zoom, grid_bits)
+                cls._source = source
+                logger.info(f"Built map cluster index ({len(cls._current.members)} occupied cells)")
+            return cls._current
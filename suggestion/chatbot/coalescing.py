@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.cache import cache
+import hashlib
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A computation in flight that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Coalesce concurrent identical computations into one.
+
+    Within a process, the first caller for a key runs the function and every
+    concurrent caller with the same key waits for its result. When
+    ``CHATBOT_SINGLE_FLIGHT_SHARED`` is enabled, the leader additionally takes a
+    lock in the shared cache so other workers poll for the published result
+    instead of recomputing it.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def wait_timeout(self) -> float:
+        return getattr(settings, 'CHATBOT_SINGLE_FLIGHT_TIMEOUT', 5)
+
+    @property
+    def shared(self) -> bool:
+        return getattr(settings, 'CHATBOT_SINGLE_FLIGHT_SHARED', False)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return fn(), sharing the call with any concurrent caller using the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            logger.warning(f"Single-flight wait timed out for {self.namespace}:{key}")
+            return fn()
+
+        try:
+            call.result = self._run_shared(key, fn) if self.shared else fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Coordinate with other workers through cache.add used as a lock"""
+        # Hashed so free-text keys are safe for memcached-style backends
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        lock_key = f"singleflight_lock_{self.namespace}_{digest}"
+        result_key = f"singleflight_result_{self.namespace}_{digest}"
+        timeout = self.wait_timeout
+
+        if cache.add(lock_key, 1, timeout):
+            try:
+                result = fn()
+                # Wrapped so that a legitimate None result is not mistaken for a miss
+                cache.set(result_key, (result,), timeout)
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            published = cache.get(result_key)
+            if published is not None:
+                return published[0]
+            if cache.get(lock_key) is None:
+                break
+            time.sleep(self.POLL_INTERVAL)
+
+        published = cache.get(result_key)
+        if published is not None:
+            return published[0]
+        return fn()
@@ -0,0 +1,96 @@
+from django.conf import settings
+from math import radians, cos, sin, asin, sqrt, pi
+import logging
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class GeoUtils:
+    """Utility class for geographical calculations"""
+    
+    @staticmethod
+    def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        """Calculate the great circle distance between two points on Earth"""
+        try:
+            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+            dlat = lat2 - lat1 
+            dlon = lon2 - lon1 
+            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+            c = 2 * asin(sqrt(a))
+            r = 6371  # Earth's radius in kilometers
+            return c * r
+        except (ValueError, TypeError) as e:
+            logger.error(f"Error calculating distance: {e}")
+            return float('inf')
+
+    @staticmethod
+    def snap_to_cell(lat: float, lon: float) -> Tuple[float, float]:
+        """Round coordinates to the grid cell shared by nearby users"""
+        precision = getattr(settings, 'CHATBOT_CELL_PRECISION', 3)
+        return round(lat, precision), round(lon, precision)
+
+    GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+    @staticmethod
+    def geohash(lat: float, lon: float, precision: int) -> str:
+        """Encode a coordinate as a geohash of the given length"""
+        lat_range = [-90.0, 90.0]
+        lon_range = [-180.0, 180.0]
+        chars = []
+        bits = 0
+        bit_count = 0
+        even = True
+        while len(chars) < precision:
+            rng, value = (lon_range, lon) if even else (lat_range, lat)
+            mid = (rng[0] + rng[1]) / 2
+            if value >= mid:
+                bits = (bits << 1) | 1
+                rng[0] = mid
+            else:
+                bits <<= 1
+                rng[1] = mid
+            even = not even
+            bit_count += 1
+            if bit_count == 5:
+                chars.append(GeoUtils.GEOHASH_ALPHABET[bits])
+                bits = 0
+                bit_count = 0
+        return ''.join(chars)
+
+    @staticmethod
+    def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+        """Return (min_lat, max_lat, min_lon, max_lon) of a geohash cell"""
+        lat_range = [-90.0, 90.0]
+        lon_range = [-180.0, 180.0]
+        even = True
+        for char in geohash:
+            code = GeoUtils.GEOHASH_ALPHABET.index(char)
+            for shift in range(4, -1, -1):
+                rng = lon_range if even else lat_range
+                mid = (rng[0] + rng[1]) / 2
+                if code >> shift & 1:
+                    rng[0] = mid
+                else:
+                    rng[1] = mid
+                even = not even
+        return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+    @staticmethod
+    def min_distance_to_box(lat: float, lon: float, box: Tuple[float, float, float, float]) -> float:
+        """Lower bound in km on the distance from a point to any point in a lat/lon box"""
+        min_lat, max_lat, min_lon, max_lon = box
+        if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+            return 0.0
+        clamped_lat = min(max(lat, min_lat), max_lat)
+        clamped_lon = min(max(lon, min_lon), max_lon)
+        distance = GeoUtils.haversine(lat, lon, clamped_lat, clamped_lon)
+        if clamped_lon != lon:
+            # The nearest point on a meridian edge can sit at another latitude;
+            # the cross-track distance to that meridian's great circle bounds it
+            dlon = radians(abs(lon - clamped_lon))
+            if dlon < pi / 2:
+                cross_track = asin(min(1.0, sin(dlon) * cos(radians(lat)))) * 6371
+                distance = min(distance, cross_track)
+        return distance
+
@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from collections import deque
+import gc
+import multiprocessing
+import os
+import sys
+import time
+from chatbot import bulk
+from chatbot.place_store import StoredPlace
+from chatbot.views import PlaceService
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute nearest/category recommendations for a CSV or NDJSON file of "
+        "(id, lat, lon, optional category) rows using a process pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Input file (.csv with a header row, or .ndjson/.jsonl); '-' for stdin")
+        parser.add_argument('--output', required=True, help="Output file (.csv or .ndjson); '-' for stdout")
+        parser.add_argument('--input-format', choices=['csv', 'ndjson'], help="Override format detection")
+        parser.add_argument('--output-format', choices=['csv', 'ndjson'], help="Override format detection")
+        parser.add_argument('--limit', type=int, default=5, help="Places per location (default 5)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows per task sent to a worker")
+
+    @staticmethod
+    def _detect_format(path: str, override: str) -> str:
+        if override:
+            return override
+        return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+    def handle(self, *args, **options):
+        if options['limit'] < 1 or options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--limit, --workers and --chunk-size must be positive")
+
+        input_format = self._detect_format(options['input'], options['input_format'])
+        output_format = self._detect_format(options['output'], options['output_format'])
+
+        store_path = getattr(settings, 'CHATBOT_PLACE_STORE', None)
+        if store_path and os.path.exists(store_path):
+            places = None
+        else:
+            store_path = None
+            places = [StoredPlace(p.pk, p.name, p.category, p.latitude, p.longitude, p.rating)
+                      for p in PlaceService.candidate_places()]
+            if not places:
+                raise CommandError("No places to recommend from")
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+
+        init_args = (places, str(store_path) if store_path else None,
+                     getattr(settings, 'CHATBOT_SHARD_PRECISION', 3), options['limit'])
+        forked = 'fork' in multiprocessing.get_all_start_methods()
+        if forked:
+            # Build the index once; forked workers inherit it copy-on-write. Pages are
+            # only copied when a worker touches them (reference counts), and freezing
+            # keeps the garbage collector from touching all of them.
+            bulk.init_worker(*init_args)
+            places = None
+            gc.freeze()
+            context, initializer, init_args = multiprocessing.get_context('fork'), None, ()
+        else:
+            # Spawned workers start empty and build their own index
+            context, initializer = multiprocessing.get_context(), bulk.init_worker
+        source = sys.stdin if options['input'] == '-' else open(options['input'], newline='', encoding='utf-8')
+        sink = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='', encoding='utf-8')
+
+        started = time.perf_counter()
+        total = errors = 0
+        try:
+            writer = bulk.ResultWriter(sink, output_format)
+            chunks = bulk.chunked(bulk.read_rows(source, input_format), options['chunk_size'])
+            # At most two outstanding chunks per worker keeps memory bounded on huge inputs
+            max_pending = options['workers'] * 2
+
+            with context.Pool(options['workers'], initializer, init_args) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.apply_async(bulk.recommend_chunk, (chunk,)))
+                    if len(pending) >= max_pending:
+                        total, errors = self._drain_one(pending, writer, total, errors, started)
+                while pending:
+                    total, errors = self._drain_one(pending, writer, total, errors, started)
+        except ValueError as e:
+            raise CommandError(f"Could not parse input: {e}")
+        finally:
+            if forked:
+                gc.unfreeze()
+            if source is not sys.stdin:
+                source.close()
+            if sink is not sys.stdout:
+                sink.close()
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0.0
+        self.stderr.write(self.style.SUCCESS(
+            f"Processed {total} locations ({errors} invalid) in {elapsed:.2f}s - {rate:,.0f} locations/s"
+        ))
+
+    def _drain_one(self, pending, writer, total, errors, started):
+        """Write the oldest finished chunk, keeping output in input order"""
+        written, failed = writer.write(pending.popleft().get())
+        previous = total
+        total += written
+        errors += failed
+        # Report throughput roughly every 10k rows
+        if total // 10000 != previous // 10000:
+            elapsed = time.perf_counter() - started
+            self.stderr.write(f"{total} locations processed, {total / elapsed:,.0f} locations/s")
+        return total, errors
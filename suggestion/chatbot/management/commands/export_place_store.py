@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.models import Place
+from chatbot.place_store import PlaceStore, PlaceStoreWriter
+
+
+class Command(BaseCommand):
+    help = "Export all places into the memory-mapped binary place store"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help="Destination file (defaults to the CHATBOT_PLACE_STORE setting)",
+        )
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'CHATBOT_PLACE_STORE', None)
+        if not path:
+            raise CommandError("No output path: pass --output or set CHATBOT_PLACE_STORE")
+
+        places = Place.objects.only('id', 'name', 'category', 'latitude', 'longitude', 'rating').order_by('id')
+        count = PlaceStoreWriter.export(places.iterator(), str(path))
+        store = PlaceStore(str(path))
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {count} places to {path} (stamp {store.stamp})"
+        ))
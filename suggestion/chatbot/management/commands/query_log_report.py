@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max
+from django.db.models.functions import Lower
+from django.utils import timezone
+from datetime import timedelta
+from chatbot.models import QueryLog
+
+
+class Command(BaseCommand):
+    help = "Report the most frequent unmatched chat messages and the slowest stages from the query log"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=7, help="Only look at the last N days (default 7)")
+        parser.add_argument('--top', type=int, default=20, help="Unmatched messages to list (default 20)")
+
+    def handle(self, *args, **options):
+        if options['days'] <= 0 or options['top'] < 1:
+            raise CommandError("--days and --top must be positive")
+
+        logs = QueryLog.objects.filter(created_at__gte=timezone.now() - timedelta(days=options['days']))
+        total = logs.count()
+        self.stdout.write(f"{total} messages in the last {options['days']:g} days")
+        if not total:
+            return
+
+        unmatched = (logs.filter(response_type='fallback')
+                     .annotate(text=Lower('message'))
+                     .values('text')
+                     .annotate(count=Count('id'))
+                     .order_by('-count', 'text')[:options['top']])
+        self.stdout.write(self.style.MIGRATE_HEADING("\nTop unmatched messages"))
+        for row in unmatched:
+            self.stdout.write(f"{row['count']:>7}  {row['text']}")
+
+        stages = (logs.values('stage')
+                  .annotate(count=Count('id'), avg=Avg('latency_ms'), max=Max('latency_ms'))
+                  .order_by('-avg'))
+        self.stdout.write(self.style.MIGRATE_HEADING("\nSlowest stages (latency in ms)"))
+        self.stdout.write(f"{'stage':<12}{'count':>8}{'avg':>10}{'p95':>10}{'max':>10}")
+        for row in stages:
+            self.stdout.write(
+                f"{row['stage'] or '-':<12}{row['count']:>8}{row['avg']:>10.1f}"
+                f"{self._percentile(logs, row['stage'], row['count'], 0.95):>10.1f}{row['max']:>10.1f}"
+            )
+
+    @staticmethod
+    def _percentile(logs, stage, count: int, fraction: float) -> float:
+        """Latency at a percentile, fetched as a single row by offset"""
+        index = min(count - 1, int(count * fraction))
+        latencies = logs.filter(stage=stage) if stage is not None else logs.filter(stage__isnull=True)
+        return latencies.order_by('latency_ms').values_list('latency_ms', flat=True)[index]
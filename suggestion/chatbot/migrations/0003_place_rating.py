@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_faq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
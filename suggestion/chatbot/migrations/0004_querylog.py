@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0003_place_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.CharField(max_length=500)),
+                ('stage', models.CharField(blank=True, max_length=20, null=True)),
+                ('response_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('latency_ms', models.FloatField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,10 +1,12 @@
 from django.db import models
+from django.utils import timezone
 
 class Place(models.Model):
     name = models.CharField(max_length=100)
     latitude = models.FloatField()
     longitude = models.FloatField()
     category = models.CharField(max_length=50, blank=True, null=True)
+    rating = models.FloatField(blank=True, null=True)  # 0-5 popularity/quality score
 
     def __str__(self):
         return self.name
@@ -17,4 +19,26 @@ class FAQ(models.Model):
         return self.question[:50]
 
 
+class QueryLog(models.Model):
+    """One chat message with how it was handled, written in batches by QueryLogWriter"""
+    message = models.CharField(max_length=500)
+    stage = models.CharField(max_length=20, blank=True, null=True)  # detected stage, e.g. "category" or "faq"
+    response_type = models.CharField(max_length=50, blank=True, null=True)  # e.g. "faq" or "fallback"
+    status_code = models.PositiveSmallIntegerField()
+    latency_ms = models.FloatField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.stage}: {self.message[:50]}"
+
+
+class DataStamp(models.Model):
+    """Last-change stamp of some shared data, read by every worker (see DataVersion)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField()  # nanosecond timestamp of the last change
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
 # Create your models here.
@@ -0,0 +1,192 @@
+from django.conf import settings
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import logging
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PLCSTOR1'
+FORMAT_VERSION = 2
+NO_STRING = 0xFFFFFFFF
+
+# magic, format version, export stamp, place count, string count,
+# then byte offsets of: ids, latitudes, longitudes, ratings (NaN = unrated),
+# category codes, name codes, string offsets, string data
+HEADER = struct.Struct('<8sIQII8Q')
+
+
+class StoredPlace(NamedTuple):
+    """Read-only place record with the attributes PlaceService uses from Place"""
+    pk: int
+    name: str
+    category: Optional[str]
+    latitude: float
+    longitude: float
+    rating: Optional[float] = None
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+class PlaceStoreWriter:
+    """Writes places into the compact columnar binary format read by PlaceStore"""
+
+    @staticmethod
+    def export(places: Iterable, path: str) -> int:
+        """Write places atomically to path and return the number exported"""
+        ids: List[int] = []
+        lats: List[float] = []
+        lons: List[float] = []
+        ratings: List[float] = []
+        cat_codes: List[int] = []
+        name_codes: List[int] = []
+        strings: List[bytes] = []
+        interned = {}
+
+        def intern(value: Optional[str]) -> int:
+            if value is None:
+                return NO_STRING
+            code = interned.get(value)
+            if code is None:
+                code = interned[value] = len(strings)
+                strings.append(value.encode('utf-8'))
+            return code
+
+        for place in places:
+            ids.append(place.pk)
+            lats.append(place.latitude)
+            lons.append(place.longitude)
+            ratings.append(math.nan if place.rating is None else place.rating)
+            cat_codes.append(intern(place.category))
+            name_codes.append(intern(place.name))
+
+        count = len(ids)
+        string_offsets = [0]
+        for value in strings:
+            string_offsets.append(string_offsets[-1] + len(value))
+
+        columns = [
+            struct.pack(f'<{count}q', *ids),
+            struct.pack(f'<{count}d', *lats),
+            struct.pack(f'<{count}d', *lons),
+            struct.pack(f'<{count}d', *ratings),
+            struct.pack(f'<{count}I', *cat_codes),
+            struct.pack(f'<{count}I', *name_codes),
+            struct.pack(f'<{len(string_offsets)}I', *string_offsets),
+            b''.join(strings),
+        ]
+        offsets = []
+        position = _align(HEADER.size)
+        for column in columns:
+            offsets.append(position)
+            position = _align(position + len(column))
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, time.time_ns(), count, len(strings), *offsets)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            for offset, column in zip(offsets, columns):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(column)
+        # Readers either see the old file or the complete new one
+        os.replace(tmp_path, path)
+        return count
+
+
+class PlaceStore:
+    """Zero-copy, memory-mapped view of an exported place file.
+
+    Coordinate and code columns are memoryviews over the shared mapping, so
+    every worker process reads the same page-cache copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        (magic, version, self.stamp, self.count, string_count, ids_off, lat_off, lon_off,
+         rating_off, cat_off, name_off, str_index_off, str_data_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} place store")
+
+        view = memoryview(self._mm)
+        n = self.count
+        self.ids = view[ids_off:ids_off + 8 * n].cast('q')
+        self.latitudes = view[lat_off:lat_off + 8 * n].cast('d')
+        self.longitudes = view[lon_off:lon_off + 8 * n].cast('d')
+        self.ratings = view[rating_off:rating_off + 8 * n].cast('d')
+        self.category_codes = view[cat_off:cat_off + 4 * n].cast('I')
+        self.name_codes = view[name_off:name_off + 4 * n].cast('I')
+        self._string_offsets = view[str_index_off:str_index_off + 4 * (string_count + 1)].cast('I')
+        self._string_data = view[str_data_off:]
+        self._strings: List[Optional[str]] = [None] * string_count
+
+    def string(self, code: int) -> Optional[str]:
+        """Decode an interned string once and keep it"""
+        if code == NO_STRING:
+            return None
+        value = self._strings[code]
+        if value is None:
+            start, end = self._string_offsets[code], self._string_offsets[code + 1]
+            value = self._strings[code] = str(self._string_data[start:end], 'utf-8')
+        return value
+
+    def _category_codes_matching(self, category: str) -> set:
+        """Codes whose category contains the given text, like category__icontains"""
+        needle = category.lower()
+        codes = set(self.category_codes)
+        codes.discard(NO_STRING)
+        return {code for code in codes if needle in self.string(code).lower()}
+
+    def iter_places(self, category: Optional[str] = None) -> Iterator[StoredPlace]:
+        """Yield stored places, optionally restricted to a category substring"""
+        wanted = self._category_codes_matching(category) if category else None
+        for i in range(self.count):
+            code = self.category_codes[i]
+            if wanted is not None and code not in wanted:
+                continue
+            rating = self.ratings[i]
+            yield StoredPlace(self.ids[i], self.string(self.name_codes[i]), self.string(code),
+                              self.latitudes[i], self.longitudes[i], None if math.isnan(rating) else rating)
+
+    _current: Optional['PlaceStore'] = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def current(cls) -> Optional['PlaceStore']:
+        """The configured store, reopened when the file is re-exported"""
+        path = getattr(settings, 'CHATBOT_PLACE_STORE', None)
+        if not path:
+            return None
+
+        now = time.monotonic()
+        interval = getattr(settings, 'CHATBOT_PLACE_STORE_CHECK_INTERVAL', 1.0)
+        if cls._current is not None and now - cls._checked_at < interval:
+            return cls._current
+
+        with cls._lock:
+            cls._checked_at = now
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                cls._current = None
+                return None
+            file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if cls._current is None or cls._current.file_id != file_id:
+                try:
+                    cls._current = cls(str(path))
+                    logger.info(f"Loaded place store {path} ({cls._current.count} places, stamp {cls._current.stamp})")
+                except (OSError, ValueError, struct.error) as e:
+                    logger.error(f"Error loading place store {path}: {e}")
+                    cls._current = None
+            return cls._current
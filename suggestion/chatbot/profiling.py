@@ -0,0 +1,197 @@
+from django.conf import settings
+import cProfile
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_CHATBOT_PROFILE'
+
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of captured request profiles.
+
+    Each capture is a pstats file (``<id>.prof``) plus a JSON sidecar with the
+    request metadata. Once ``CHATBOT_PROFILE_MAX_FILES`` captures exist, the
+    oldest ones are deleted.
+    """
+
+    ID_PATTERN = re.compile(r'^[0-9]+-[0-9a-f]{8}$')
+
+    @staticmethod
+    def directory() -> Path:
+        return Path(getattr(settings, 'CHATBOT_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+    @staticmethod
+    def max_files() -> int:
+        return getattr(settings, 'CHATBOT_PROFILE_MAX_FILES', 50)
+
+    @classmethod
+    def save(cls, profiler: cProfile.Profile, metadata: Dict) -> str:
+        """Write a profile and its metadata, then trim the buffer"""
+        directory = cls.directory()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # Nanosecond prefix keeps lexical order equal to capture order
+        profile_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(str(directory / f"{profile_id}.prof"))
+        metadata = dict(metadata, id=profile_id)
+        (directory / f"{profile_id}.json").write_text(json.dumps(metadata), encoding='utf-8')
+
+        cls._trim(directory)
+        return profile_id
+
+    @classmethod
+    def _trim(cls, directory: Path) -> None:
+        captures = sorted(directory.glob('*.json'))
+        for sidecar in captures[:max(len(captures) - cls.max_files(), 0)]:
+            for path in (sidecar, sidecar.with_suffix('.prof')):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    @classmethod
+    def list(cls) -> List[Dict]:
+        """Metadata of all captured profiles, newest first"""
+        directory = cls.directory()
+        if not directory.exists():
+            return []
+        result = []
+        for sidecar in sorted(directory.glob('*.json'), reverse=True):
+            try:
+                result.append(json.loads(sidecar.read_text(encoding='utf-8')))
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading profile metadata {sidecar.name}: {e}")
+        return result
+
+    @classmethod
+    def path_for(cls, profile_id: str) -> Optional[Path]:
+        """Path of a captured profile, or None for unknown/invalid ids"""
+        if not cls.ID_PATTERN.match(profile_id):
+            return None
+        path = cls.directory() / f"{profile_id}.prof"
+        return path if path.exists() else None
+
+
+class ProfiledStream:
+    """Body of a streaming response, profiled while the server consumes it.
+
+    ``on_close(cpu_ms)`` runs once, when the body is exhausted or closed
+    (Django closes it when the response is closed, e.g. on disconnect).
+    """
+
+    def __init__(self, content, profiler: cProfile.Profile, on_close):
+        self.content = iter(content)
+        self.profiler = profiler
+        self.on_close = on_close
+        self.cpu_ms = 0.0
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cpu_start = time.thread_time()
+        done = False
+        self.profiler.enable()
+        try:
+            return next(self.content)
+        except BaseException:
+            done = True
+            raise
+        finally:
+            self.profiler.disable()
+            self.cpu_ms += (time.thread_time() - cpu_start) * 1000
+            if done:
+                self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.on_close(self.cpu_ms)
+
+
+class ProfilingMixin:
+    """Opt-in cProfile capture for API views.
+
+    A request is profiled when it carries an ``X-Chatbot-Profile`` header equal to
+    ``CHATBOT_PROFILE_TOKEN``, or when it is picked by ``CHATBOT_PROFILE_SAMPLE_RATE``.
+    Only one request is profiled at a time; others run normally. Streaming
+    responses are profiled until their body has been sent; such views report
+    the message type by setting ``profile_message_type``.
+    """
+
+    _profiling_lock = threading.Lock()
+    profile_message_type: Optional[str] = None
+
+    def _profile_trigger(self, request) -> Optional[str]:
+        token = getattr(settings, 'CHATBOT_PROFILE_TOKEN', None)
+        if token and request.META.get(PROFILE_HEADER) == token:
+            return 'header'
+        sample_rate = getattr(settings, 'CHATBOT_PROFILE_SAMPLE_RATE', 0.0)
+        if sample_rate and random.random() < sample_rate:
+            return 'sample'
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        trigger = self._profile_trigger(request)
+        if trigger is None or not self._profiling_lock.acquire(blocking=False):
+            return super().dispatch(request, *args, **kwargs)
+
+        streaming = False
+        try:
+            profiler = cProfile.Profile()
+            wall_start = time.perf_counter()
+            cpu_start = time.thread_time()
+            profiler.enable()
+            try:
+                response = super().dispatch(request, *args, **kwargs)
+            finally:
+                profiler.disable()
+            cpu_ms = (time.thread_time() - cpu_start) * 1000
+
+            streaming = getattr(response, 'streaming', False)
+            if streaming:
+                # The view only built a generator; keep profiling (and the lock) while it runs
+                def finish(stream_cpu_ms: float) -> None:
+                    try:
+                        self._save_profile(request, response, trigger, profiler,
+                                           wall_start, cpu_ms + stream_cpu_ms)
+                    finally:
+                        self._profiling_lock.release()
+
+                response.streaming_content = ProfiledStream(response.streaming_content, profiler, finish)
+            else:
+                self._save_profile(request, response, trigger, profiler, wall_start, cpu_ms)
+            return response
+        finally:
+            if not streaming:
+                self._profiling_lock.release()
+
+    def _save_profile(self, request, response, trigger: str, profiler: cProfile.Profile,
+                      wall_start: float, cpu_ms: float) -> None:
+        data = getattr(response, 'data', None)
+        message_type = data.get('type') if isinstance(data, dict) else self.profile_message_type
+        try:
+            ProfileStore.save(profiler, {
+                "created": time.time(),
+                "view": type(self).__name__,
+                "method": request.method,
+                "path": request.path,
+                "trigger": trigger,
+                "message_type": message_type,
+                "status": response.status_code,
+                "streaming": getattr(response, 'streaming', False),
+                "wall_ms": round((time.perf_counter() - wall_start) * 1000, 3),
+                "cpu_ms": round(cpu_ms, 3),
+            })
+        except OSError as e:
+            logger.error(f"Error saving request profile: {e}")
@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db import connection, DatabaseError
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+import logging
+from typing import List, Optional
+from .models import QueryLog
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLogWriter:
+    """Write-behind log of chat messages.
+
+    Requests only enqueue a QueryLog row; a daemon thread per process
+    bulk-inserts them in batches, so logging adds no database round trip or
+    write lock to the request. The queue is bounded: past half full only a
+    ``CHATBOT_QUERY_LOG_PRESSURE_SAMPLE`` fraction of rows is kept and a
+    full queue drops rows, counting them in ``dropped``. Remaining rows are
+    flushed at interpreter exit.
+    """
+
+    _queue: Optional[queue.Queue] = None
+    _thread: Optional[threading.Thread] = None
+    _pid: Optional[int] = None
+    _stopping = threading.Event()
+    _lock = threading.Lock()
+    dropped = 0
+
+    @classmethod
+    def record(cls, message: str, stage: Optional[str], response_type: Optional[str],
+               status_code: int, latency_ms: float) -> None:
+        if not getattr(settings, 'CHATBOT_QUERY_LOG', True):
+            return
+        log_queue = cls._ensure_started()
+
+        # Shed load before the queue is full so the rows that remain stay representative
+        if log_queue.qsize() * 2 >= log_queue.maxsize and \
+                random.random() >= getattr(settings, 'CHATBOT_QUERY_LOG_PRESSURE_SAMPLE', 0.1):
+            cls.dropped += 1
+            return
+        row = QueryLog(message=message[:500], stage=stage, response_type=response_type,
+                       status_code=status_code, latency_ms=round(latency_ms, 3))
+        try:
+            log_queue.put_nowait(row)
+        except queue.Full:
+            cls.dropped += 1
+
+    @classmethod
+    def _ensure_started(cls) -> queue.Queue:
+        """Queue of the current process, starting its flusher thread on first use"""
+        pid = os.getpid()
+        if cls._pid == pid:
+            return cls._queue
+        with cls._lock:
+            # A forked worker inherits the parent's queue but not its thread
+            if cls._pid != pid:
+                cls._queue = queue.Queue(maxsize=getattr(settings, 'CHATBOT_QUERY_LOG_QUEUE_SIZE', 10000))
+                cls._stopping.clear()
+                cls._thread = threading.Thread(target=cls._run, name="query-log-flusher", daemon=True)
+                cls._thread.start()
+                cls._pid = pid
+        return cls._queue
+
+    @classmethod
+    def _run(cls) -> None:
+        log_queue = cls._queue
+        batch_size = getattr(settings, 'CHATBOT_QUERY_LOG_BATCH_SIZE', 200)
+        interval = getattr(settings, 'CHATBOT_QUERY_LOG_FLUSH_INTERVAL', 2.0)
+        try:
+            while not cls._stopping.is_set():
+                batch: List[QueryLog] = []
+                deadline = time.monotonic() + interval
+                # Collect until the batch is full or the interval has passed
+                while len(batch) < batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(log_queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                cls._write(batch)
+        finally:
+            connection.close()
+
+    @classmethod
+    def _write(cls, batch: List[QueryLog]) -> None:
+        if cls.dropped:
+            logger.warning(f"Query log dropped {cls.dropped} rows under load")
+            cls.dropped = 0
+        if not batch:
+            return
+        try:
+            QueryLog.objects.bulk_create(batch)
+        except DatabaseError as e:
+            logger.error(f"Error writing {len(batch)} query log rows: {e}")
+
+    @classmethod
+    def flush(cls) -> None:
+        """Stop the flusher and write whatever is still queued"""
+        if cls._pid != os.getpid():
+            return
+        cls._stopping.set()
+        cls._thread.join(timeout=getattr(settings, 'CHATBOT_QUERY_LOG_FLUSH_INTERVAL', 2.0) + 1)
+        batch = []
+        while True:
+            try:
+                batch.append(cls._queue.get_nowait())
+            except queue.Empty:
+                break
+        cls._write(batch)
+        cls._pid = None
+
+
+atexit.register(QueryLogWriter.flush)
@@ -0,0 +1,62 @@
+from django.conf import settings
+from collections import OrderedDict
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+from .versioning import DataVersion
+
+
+class QueryPlan(NamedTuple):
+    """Everything the dispatcher needs to answer a message, minus the user's location"""
+    message: str
+    stage: str
+    params: Dict[str, Any]
+
+
+class QueryPlanCache:
+    """Bounded LRU of normalized message -> QueryPlan.
+
+    Plans depend on ChatbotConfig and on the FAQ table, so the whole cache is
+    dropped when the shared ``chatbot`` data version moves.
+    """
+
+    MAX_KEY_LENGTH = 200  # long, one-off messages are not worth caching
+
+    version = DataVersion("chatbot")
+    _plans: 'OrderedDict[str, QueryPlan]' = OrderedDict()
+    _built_for: Optional[int] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def normalize(raw_message: str) -> str:
+        return str(raw_message).strip().lower()
+
+    @classmethod
+    def get(cls, key: str) -> Optional[QueryPlan]:
+        version = cls.version.current()
+        with cls._lock:
+            if cls._built_for != version:
+                cls._plans.clear()
+                cls._built_for = version
+                return None
+            plan = cls._plans.get(key)
+            if plan is not None:
+                cls._plans.move_to_end(key)
+            return plan
+
+    @classmethod
+    def put(cls, key: str, plan: QueryPlan) -> None:
+        if len(key) > cls.MAX_KEY_LENGTH:
+            return
+        max_size = getattr(settings, 'CHATBOT_PARSE_CACHE_SIZE', 4096)
+        with cls._lock:
+            cls._plans[key] = plan
+            cls._plans.move_to_end(key)
+            while len(cls._plans) > max_size:
+                cls._plans.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop cached plans in every worker"""
+        cls.version.bump()
+        with cls._lock:
+            cls._plans.clear()
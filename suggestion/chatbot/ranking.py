@@ -0,0 +1,150 @@
+from django.conf import settings
+import heapq
+import math
+import threading
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .geo import GeoUtils
+from .place_store import StoredPlace
+
+logger = logging.getLogger(__name__)
+
+MAX_RATING = 5.0
+
+
+def composite_score(distance_km: float, rating: float, weight: float, decay_km: float) -> float:
+    """Exponential distance decay blended with a rating in [0, MAX_RATING]"""
+    return (1 - weight) * math.exp(-distance_km / decay_km) + weight * rating / MAX_RATING
+
+
+class RatedPlaceIndex:
+    """Top-k places by a composite of distance decay and rating.
+
+    Two sorted sources are kept: a geohash trie that streams places in
+    increasing distance from the user (best-first search over cell bounds),
+    and a list ordered by rating. ``top_k`` runs Fagin's threshold algorithm
+    over both, stopping as soon as no unseen place can beat the k-th score,
+    so most places are never scored.
+
+    Each worker process builds its own copies of the places, so the shared
+    store or shard router is preferred when one is in use; these indexes serve
+    area-restricted queries and setups without sharding.
+    """
+
+    def __init__(self, places: Iterable, precision: int = 5):
+        self.places: List[StoredPlace] = [
+            StoredPlace(p.pk, p.name, p.category, p.latitude, p.longitude, p.rating) for p in places
+        ]
+        self.by_rating = sorted(range(len(self.places)),
+                                key=lambda i: self.rating_of(self.places[i]), reverse=True)
+
+        # Trie over geohash prefixes: '' is the world, leaves hold place indexes
+        self.precision = precision
+        self.children: Dict[str, List[str]] = {}
+        self.leaves: Dict[str, List[int]] = {}
+        for i, place in enumerate(self.places):
+            cell = GeoUtils.geohash(place.latitude, place.longitude, precision)
+            self.leaves.setdefault(cell, []).append(i)
+        for cell in self.leaves:
+            for length in range(precision):
+                siblings = self.children.setdefault(cell[:length], [])
+                if cell[:length + 1] not in siblings:
+                    siblings.append(cell[:length + 1])
+        self.bounds = {prefix: GeoUtils.geohash_bounds(prefix)
+                       for prefixes in self.children.values() for prefix in prefixes}
+
+    @staticmethod
+    def rating_of(place: StoredPlace) -> float:
+        if place.rating is None:
+            return getattr(settings, 'CHATBOT_UNRATED_RATING', 2.5)
+        return min(max(place.rating, 0.0), MAX_RATING)
+
+    @staticmethod
+    def score(distance_km: float, rating: float) -> float:
+        """Composite score in [0, 1]: exponential distance decay blended with rating"""
+        return composite_score(distance_km, rating, getattr(settings, 'CHATBOT_RATING_WEIGHT', 0.3),
+                               getattr(settings, 'CHATBOT_DISTANCE_DECAY_KM', 5.0))
+
+    def nearest_stream(self, lat: float, lon: float) -> Iterator[Tuple[float, int]]:
+        """Yield (distance, place index) in increasing distance, expanding cells lazily"""
+        # Entries: (distance or lower bound, kind, tie-breaker, payload); kind 0 = place, 1 = cell
+        heap = [(0.0, 1, 0, '')]
+        counter = 1
+        while heap:
+            dist, kind, _, payload = heapq.heappop(heap)
+            if kind == 0:
+                yield dist, payload
+                continue
+            if payload in self.leaves:
+                for i in self.leaves[payload]:
+                    place = self.places[i]
+                    heapq.heappush(heap, (GeoUtils.haversine(lat, lon, place.latitude, place.longitude), 0, counter, i))
+                    counter += 1
+            for child in self.children.get(payload, []):
+                bound = GeoUtils.min_distance_to_box(lat, lon, self.bounds[child])
+                heapq.heappush(heap, (bound, 1, counter, child))
+                counter += 1
+
+    def top_k(self, lat: float, lon: float, k: int) -> List[Tuple[float, float, StoredPlace]]:
+        """Best k (score, distance, place) triples, highest score first"""
+        if k <= 0 or not self.places:
+            return []
+
+        distances = self.nearest_stream(lat, lon)
+        rating_pos = 0
+        seen = set()
+        best: List[Tuple[float, int, float]] = []  # min-heap of (score, index, distance)
+
+        def consider(i: int, dist: float) -> None:
+            if i in seen:
+                return
+            seen.add(i)
+            entry = (self.score(dist, self.rating_of(self.places[i])), i, dist)
+            if len(best) < k:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        while True:
+            # Sorted access on distance
+            nearest = next(distances, None)
+            if nearest is None:
+                break
+            last_distance, i = nearest
+            consider(i, last_distance)
+
+            # Sorted access on rating, with random access to the distance
+            if rating_pos >= len(self.by_rating):
+                break
+            j = self.by_rating[rating_pos]
+            rating_pos += 1
+            place = self.places[j]
+            last_rating = self.rating_of(place)
+            consider(j, GeoUtils.haversine(lat, lon, place.latitude, place.longitude))
+
+            # No unseen place can score above the threshold
+            threshold = self.score(last_distance, last_rating)
+            if len(best) == k and best[0][0] >= threshold:
+                break
+
+        ranked = sorted(best, reverse=True)
+        return [(score, dist, self.places[i]) for score, i, dist in ranked]
+
+    _indexes: Dict[Tuple[Optional[str], Optional[str]], 'RatedPlaceIndex'] = {}
+    _source: Optional[object] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def current(cls, source_version: object, load_places, category: Optional[str] = None,
+                area: Optional[str] = None) -> 'RatedPlaceIndex':
+        """Process-wide index for a category and area, rebuilt when the place source changes"""
+        with cls._lock:
+            if cls._source != source_version:
+                cls._indexes = {}
+                cls._source = source_version
+            index = cls._indexes.get((category, area))
+            if index is None:
+                index = cls._indexes[(category, area)] = cls(load_places(category, area))
+                logger.info(f"Built rated place index for {category or 'all places'} in {area or 'all areas'} "
+                            f"({len(index.places)} places)")
+            return index
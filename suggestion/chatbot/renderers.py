@@ -0,0 +1,33 @@
+from rest_framework.renderers import BaseRenderer
+from django.core.serializers.json import DjangoJSONEncoder
+import json
+from typing import Any
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renders chatbot events as Server-Sent Events"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def format_event(self, event: str, data: Any) -> bytes:
+        payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return f"event: {event}\ndata: {payload}\n\n".encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        # Non-streamed responses (e.g. validation errors) become a single reply event
+        return self.format_event('reply', data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders chatbot events as newline-delimited JSON objects"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def format_event(self, event: str, data: Any) -> bytes:
+        payload = json.dumps({"event": event, "data": data}, cls=DjangoJSONEncoder, ensure_ascii=False)
+        return (payload + "\n").encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        return self.format_event('reply', data)
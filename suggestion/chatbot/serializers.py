@@ -1,4 +1,8 @@
 from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+import json
+import threading
+from typing import Any, Dict, Tuple
 from .models import Place
 
 class PlaceSerializer(serializers.ModelSerializer):
@@ -6,4 +10,115 @@ class PlaceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Place
-        fields = ['id', 'name', 'latitude', 'longitude', 'category', 'distance']
+        fields = ['id', 'name', 'latitude', 'longitude', 'category', 'rating', 'distance']
+
+
+def _encode(value: Any, encoder_class=None) -> bytes:
+    """Compact JSON exactly as DRF's JSONRenderer writes it"""
+    encoded = json.dumps(value, cls=encoder_class, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    # Line and paragraph separators are valid JSON but not valid JavaScript
+    return encoded.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+
+
+class PlacePayload(dict):
+    """A place as returned in API responses.
+
+    Behaves like the plain dict the views always used, but also carries the
+    pre-encoded JSON of its static fields so renderers can splice it in
+    instead of re-encoding it.
+    """
+
+    def __init__(self, static: Dict, fragment: bytes, **extra):
+        super().__init__(static, **extra)
+        self.fragment = fragment
+        self.extra = extra
+
+    def encode(self) -> bytes:
+        """JSON object for this place: cached static fragment plus per-request fields"""
+        parts = [b'{', self.fragment]
+        for key, value in self.extra.items():
+            parts.append(b',' + _encode(key) + b':' + _encode(value))
+        parts.append(b'}')
+        return b''.join(parts)
+
+    def with_extra(self, **extra) -> 'PlacePayload':
+        """Copy with some per-request fields replaced; payloads may be shared through caches"""
+        static = {key: value for key, value in self.items() if key not in self.extra}
+        return PlacePayload(static, self.fragment, **dict(self.extra, **extra))
+
+
+class PlaceFragments:
+    """Process-wide cache of each place's static fields and their encoded JSON.
+
+    Entries are keyed by the place's id together with its field values, so a
+    place edited by another worker simply misses the cache. Local saves and
+    deletes also evict entries (see signals.py) to keep the cache bounded.
+    """
+
+    _entries: Dict[int, Tuple[Tuple, Dict, bytes]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def static_fields(place: Place) -> Dict:
+        """Fields of a place that do not depend on the request"""
+        return {
+            "name": place.name,
+            "category": place.category or "General",
+            "latitude": place.latitude,
+            "longitude": place.longitude,
+            "description": "",
+            "rating": place.rating
+        }
+
+    @classmethod
+    def _signature(cls, place: Place) -> Tuple:
+        return (place.name, place.category, place.latitude, place.longitude, place.rating)
+
+    @classmethod
+    def get(cls, place: Place) -> Tuple[Dict, bytes]:
+        """Static fields and their encoded fragment, encoding them at most once"""
+        signature = cls._signature(place)
+        entry = cls._entries.get(place.pk)
+        if entry is not None and entry[0] == signature:
+            return entry[1], entry[2]
+
+        static = cls.static_fields(place)
+        # Object body without braces so per-request fields can be appended
+        fragment = _encode(static)[1:-1]
+        with cls._lock:
+            cls._entries[place.pk] = (signature, static, fragment)
+        return static, fragment
+
+    @classmethod
+    def build(cls, place: Place, distance_km: float, **extra) -> PlacePayload:
+        """Payload for one place at a given distance from the user"""
+        static, fragment = cls.get(place)
+        return PlacePayload(static, fragment, distance_km=distance_km, **extra)
+
+    @classmethod
+    def invalidate(cls, place_id: int) -> None:
+        with cls._lock:
+            cls._entries.pop(place_id, None)
+
+
+class PlaceJSONRenderer(JSONRenderer):
+    """JSON renderer that splices pre-encoded place fragments into responses"""
+
+    @staticmethod
+    def _is_payload_list(value: Any) -> bool:
+        return isinstance(value, list) and bool(value) and all(isinstance(p, PlacePayload) for p in value)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (not isinstance(data, dict)
+                or self.get_indent(accepted_media_type, renderer_context or {})
+                or not any(self._is_payload_list(value) for value in data.values())):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        parts = []
+        for key, value in data.items():
+            if self._is_payload_list(value):
+                encoded = b'[' + b','.join(p.encode() for p in value) + b']'
+            else:
+                encoded = _encode(value, self.encoder_class)
+            parts.append(_encode(key) + b':' + encoded)
+        return b'{' + b','.join(parts) + b'}'
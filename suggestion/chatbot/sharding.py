@@ -0,0 +1,241 @@
+from django.conf import settings
+import atexit
+import heapq
+import multiprocessing
+import threading
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .geo import GeoUtils
+from .place_store import StoredPlace
+from .ranking import MAX_RATING, composite_score
+
+logger = logging.getLogger(__name__)
+
+Hit = Tuple[float, StoredPlace]
+ScoredHit = Tuple[float, float, StoredPlace]
+
+
+class Shard:
+    """Places of one geohash region"""
+
+    def __init__(self, key: str, places: List[StoredPlace]):
+        self.key = key
+        self.places = places
+        self.bounds = GeoUtils.geohash_bounds(key)
+
+    def top_k(self, lat: float, lon: float, k: int, category: Optional[str] = None,
+              max_distance: Optional[float] = None, hours: Optional[int] = None) -> List[Hit]:
+        """Nearest k places of this shard matching the filters"""
+        needle = category.lower() if category else None
+        hits = []
+        for place in self.places:
+            if needle is not None and needle not in (place.category or '').lower():
+                continue
+            if hours is not None and getattr(place, 'average_duration', 1) > hours:
+                continue
+            dist = GeoUtils.haversine(lat, lon, place.latitude, place.longitude)
+            if max_distance is not None and dist > max_distance:
+                continue
+            hits.append((dist, place))
+        return heapq.nsmallest(k, hits, key=lambda hit: hit[0])
+
+    def top_k_by_score(self, lat: float, lon: float, k: int, category: Optional[str],
+                       weight: float, decay_km: float, unrated: float) -> List[ScoredHit]:
+        """Best k (score, distance, place) triples of this shard, highest score first.
+
+        Scoring parameters are passed in so worker processes need no settings.
+        """
+        needle = category.lower() if category else None
+        hits = []
+        for place in self.places:
+            if needle is not None and needle not in (place.category or '').lower():
+                continue
+            dist = GeoUtils.haversine(lat, lon, place.latitude, place.longitude)
+            rating = unrated if place.rating is None else min(max(place.rating, 0.0), MAX_RATING)
+            hits.append((composite_score(dist, rating, weight, decay_km), dist, place))
+        return heapq.nlargest(k, hits, key=lambda hit: hit[0])
+
+
+def _shard_worker(conn, shards: Dict[str, Shard]) -> None:
+    """Serve top-k queries (a Shard method and its arguments) for a group of shards in a separate process"""
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        keys, method, args = request
+        try:
+            conn.send([hit for key in keys for hit in getattr(shards[key], method)(*args)])
+        except Exception as e:
+            conn.send(e)
+
+
+class ShardWorker:
+    """Parent-side handle to one shard worker process"""
+
+    def __init__(self, context, shards: Dict[str, Shard], index: int):
+        self.index = index  # lock order: workers are always locked by ascending index
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_shard_worker, args=(child_conn, shards), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.lock = threading.Lock()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ShardRouter:
+    """Routes place queries to the geohash shards that can contain results.
+
+    Places are partitioned by geohash prefix (``CHATBOT_SHARD_PRECISION``).
+    A query visits shards in order of their minimum possible distance to the
+    user and stops once no unvisited shard can beat the current k-th result,
+    so results near a border are merged from the neighbouring shards. Scored
+    queries work the same way, bounding each shard by the score of a
+    top-rated place at its closest point. With
+    ``CHATBOT_SHARD_WORKERS`` > 0 the shards are spread over that many local
+    worker processes and each wave of shards is queried in parallel.
+    """
+
+    def __init__(self, places: Iterable, precision: int, workers: int = 0):
+        grouped: Dict[str, List[StoredPlace]] = {}
+        for place in places:
+            record = StoredPlace(place.pk, place.name, place.category, place.latitude, place.longitude,
+                                 place.rating)
+            key = GeoUtils.geohash(place.latitude, place.longitude, precision)
+            grouped.setdefault(key, []).append(record)
+        self.shards = {key: Shard(key, records) for key, records in grouped.items()}
+
+        self.workers: List[ShardWorker] = []
+        self.worker_for: Dict[str, ShardWorker] = {}
+        if workers > 0 and self.shards:
+            context = multiprocessing.get_context('spawn')
+            keys = sorted(self.shards)
+            for i in range(min(workers, len(keys))):
+                group = {key: self.shards[key] for key in keys[i::workers]}
+                worker = ShardWorker(context, group, i)
+                self.workers.append(worker)
+                for key in group:
+                    self.worker_for[key] = worker
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self.worker_for = {}
+
+    def _query_local(self, keys: List[str], method: str, args: Tuple) -> List:
+        return [hit for key in keys for hit in getattr(self.shards[key], method)(*args)]
+
+    def _query(self, keys: List[str], method: str, args: Tuple) -> List:
+        """Query a wave of shards, in parallel when they live in worker processes"""
+        if not self.workers:
+            return self._query_local(keys, method, args)
+
+        by_worker: Dict[ShardWorker, List[str]] = {}
+        for key in keys:
+            by_worker.setdefault(self.worker_for[key], []).append(key)
+        # A fixed lock order, whatever the wave, so concurrent queries cannot deadlock
+        workers = sorted(by_worker, key=lambda worker: worker.index)
+        for worker in workers:
+            worker.lock.acquire()
+        try:
+            for worker in workers:
+                worker.conn.send((by_worker[worker], method, args))
+            # Read every reply before raising so no pipe is left with an unread one
+            results = [worker.conn.recv() for worker in workers]
+            hits = []
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+                hits.extend(result)
+            return hits
+        except (OSError, EOFError) as e:
+            # The parent keeps every shard, so a dead worker only costs parallelism
+            logger.error(f"Shard worker failed, querying shards in-process: {e}")
+            return self._query_local(keys, method, args)
+        finally:
+            for worker in workers:
+                worker.lock.release()
+
+    def _best_first(self, pending: List[Tuple[float, str]], k: int, method: str, args: Tuple,
+                    rank: Callable) -> List:
+        """Merge the best k hits of shards visited in order of their bound.
+
+        ``pending`` holds (bound, shard key) pairs where the bound is the best
+        rank any hit of that shard can have; lower ranks are better.
+        """
+        pending.sort()
+        best = []
+        while pending:
+            if len(best) < k:
+                # Not enough results yet: take the most promising unvisited shard
+                wave = [pending[0]]
+            else:
+                kth = rank(best[-1])
+                wave = [item for item in pending if item[0] <= kth]
+                if not wave:
+                    break
+            visited = {key for _, key in wave}
+            pending = [item for item in pending if item[1] not in visited]
+            best = heapq.nsmallest(k, best + self._query([key for _, key in wave], method, args), key=rank)
+        return best
+
+    def top_k(self, lat: float, lon: float, k: int, category: Optional[str] = None,
+              max_distance: Optional[float] = None, hours: Optional[int] = None) -> List[Hit]:
+        """Global nearest k places across all shards"""
+        pending = []
+        for key, shard in self.shards.items():
+            bound = GeoUtils.min_distance_to_box(lat, lon, shard.bounds)
+            if max_distance is None or bound <= max_distance:
+                pending.append((bound, key))
+        return self._best_first(pending, k, 'top_k', (lat, lon, k, category, max_distance, hours),
+                                lambda hit: hit[0])
+
+    def top_k_by_score(self, lat: float, lon: float, k: int, category: Optional[str] = None) -> List[ScoredHit]:
+        """Global best k (score, distance, place) triples by distance decay and rating"""
+        weight = getattr(settings, 'CHATBOT_RATING_WEIGHT', 0.3)
+        decay_km = getattr(settings, 'CHATBOT_DISTANCE_DECAY_KM', 5.0)
+        unrated = getattr(settings, 'CHATBOT_UNRATED_RATING', 2.5)
+        # Ranks are negated scores; no place in a shard beats a top-rated one at its closest point
+        pending = [(-composite_score(GeoUtils.min_distance_to_box(lat, lon, shard.bounds), MAX_RATING,
+                                     weight, decay_km), key)
+                   for key, shard in self.shards.items()]
+        return self._best_first(pending, k, 'top_k_by_score', (lat, lon, k, category, weight, decay_km, unrated),
+                                lambda hit: -hit[0])
+
+    _current: Optional['ShardRouter'] = None
+    _source: Optional[object] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def current(cls, source_version: object, load_places) -> Optional['ShardRouter']:
+        """The process-wide router, rebuilt when the place source changes"""
+        if not getattr(settings, 'CHATBOT_SHARDING', False):
+            return None
+        precision = getattr(settings, 'CHATBOT_SHARD_PRECISION', 3)
+        workers = getattr(settings, 'CHATBOT_SHARD_WORKERS', 0)
+        with cls._lock:
+            source = (source_version, precision, workers)
+            if cls._current is None or cls._source != source:
+                if cls._current is not None:
+                    cls._current.close()
+                cls._current = cls(load_places(), precision, workers)
+                cls._source = source
+                logger.info(f"Built {len(cls._current.shards)} place shards")
+            return cls._current
+
+
+@atexit.register
+def _stop_shard_workers() -> None:
+    if ShardRouter._current is not None:
+        ShardRouter._current.close()
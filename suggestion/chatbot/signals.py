@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import FAQ, Place
+from .query_plan import QueryPlanCache
+from .serializers import PlaceFragments
+from .versioning import PLACES_VERSION
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_place_fragment(sender, instance, **kwargs):
+    """Drop cached data derived from a place that was saved or deleted.
+
+    Bumping the places version makes every worker rebuild its shard, ranking
+    and cluster indexes on next use.
+    """
+    PlaceFragments.invalidate(instance.pk)
+    PLACES_VERSION.bump()
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def invalidate_query_plans(sender, instance, **kwargs):
+    """Parsed message plans remember FAQ matches, so drop them when FAQs change"""
+    QueryPlanCache.invalidate()
@@ -0,0 +1,114 @@
+from typing import Collection, Dict, FrozenSet, Iterable, List, Optional, Set
+import functools
+import gzip
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SpellingIndex:
+    """Symmetric-delete (SymSpell-style) spelling index over a fixed vocabulary.
+
+    Every vocabulary word is stored under all strings reachable from it by up to
+    ``max_edit_distance`` deletions. A query token is looked up the same way, so
+    a correction costs a handful of dictionary probes instead of a scan.
+    Tokens found in ``known_words`` (a general English dictionary) are real
+    words and are never corrected, so "quite" does not become "quiet".
+    """
+
+    def __init__(self, words: Iterable[str], max_edit_distance: int = 2, min_length: int = 5,
+                 known_words: Collection[str] = frozenset()):
+        self.max_edit_distance = max_edit_distance
+        self.min_length = min_length
+        self.known_words = known_words
+        self.words: Dict[str, int] = {}
+        self.deletes: Dict[str, Set[str]] = {}
+
+        for word in words:
+            word = word.strip().lower()
+            if not word:
+                continue
+            self.words[word] = self.words.get(word, 0) + 1
+        for word in self.words:
+            for variant in self._deletes(word, self.max_edit_distance):
+                self.deletes.setdefault(variant, set()).add(word)
+
+    @staticmethod
+    def _deletes(word: str, distance: int) -> Set[str]:
+        """All strings obtained from word by removing up to `distance` characters"""
+        result = {word}
+        frontier = {word}
+        for _ in range(distance):
+            next_frontier = set()
+            for item in frontier:
+                for i in range(len(item)):
+                    next_frontier.add(item[:i] + item[i + 1:])
+            result |= next_frontier
+            frontier = next_frontier
+        return result
+
+    @staticmethod
+    def edit_distance(a: str, b: str) -> int:
+        """Optimal string alignment distance (Levenshtein plus adjacent transpositions)"""
+        rows = len(a) + 1
+        cols = len(b) + 1
+        d = [[0] * cols for _ in range(rows)]
+        for i in range(rows):
+            d[i][0] = i
+        for j in range(cols):
+            d[0][j] = j
+        for i in range(1, rows):
+            for j in range(1, cols):
+                cost = 0 if a[i - 1] == b[j - 1] else 1
+                d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+        return d[-1][-1]
+
+    def _allowed_distance(self, token: str) -> int:
+        """Short tokens only tolerate a single edit to avoid spurious corrections"""
+        return 1 if len(token) < 8 else self.max_edit_distance
+
+    def correct_token(self, token: str) -> Optional[str]:
+        """Return the best vocabulary match for a token, or None if there is none"""
+        if token in self.words:
+            return token
+        if len(token) < self.min_length or not token.isalpha() or token in self.known_words:
+            return None
+
+        allowed = self._allowed_distance(token)
+        candidates = set()
+        for variant in self._deletes(token, allowed):
+            candidates |= self.deletes.get(variant, set())
+
+        best = None
+        best_key = None
+        for candidate in candidates:
+            distance = self.edit_distance(token, candidate)
+            if distance > allowed:
+                continue
+            key = (distance, -self.words[candidate], candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best
+
+    def correct(self, message: str) -> str:
+        """Correct each token of an already cleaned message"""
+        tokens: List[str] = []
+        for token in message.split(' '):
+            corrected = self.correct_token(token)
+            tokens.append(corrected or token)
+        return ' '.join(tokens)
+
+
+@functools.lru_cache(maxsize=4)
+def load_frequency_dictionary(path: str) -> FrozenSet[str]:
+    """Words of a SymSpell-style frequency dictionary ("word count" per line, optionally gzipped)"""
+    opener = gzip.open if str(path).endswith('.gz') else open
+    try:
+        with opener(path, 'rt', encoding='utf-8') as f:
+            # Messages are cleaned of punctuation, so "don't" is looked up as "dont"
+            return frozenset(line.split(' ', 1)[0].replace("'", '') for line in f if line.strip())
+    except OSError as e:
+        logger.error(f"Error loading spelling dictionary {path}: {e}")
+        return frozenset()
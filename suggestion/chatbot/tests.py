@@ -1,3 +1,605 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from unittest import mock
+import csv
+import hashlib
+import io
+import json
+import os
+import pickle
+import pstats
+import queue
+import random
+import tempfile
+import threading
+import time
+from .areas import AreaIndex, _polygon_contains
+from .clustering import ClusterIndex
+from .coalescing import SingleFlight
+from .geo import GeoUtils
+from .models import Place, QueryLog
+from .place_store import PlaceStore, PlaceStoreWriter, StoredPlace
+from .profiling import ProfileStore
+from .serializers import PlaceFragments, PlaceJSONRenderer, PlacePayload
+from .query_plan import QueryPlan, QueryPlanCache
+from .ranking import RatedPlaceIndex
+from .sharding import ShardRouter
+from .query_log import QueryLogWriter
+from .spelling import SpellingIndex
+from .versioning import DataVersion
+from .views import ChatbotMessageAPIView, MessageProcessor
 
-# Create your tests here.
+
+class SpellingIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SpellingIndex(['restaurant', 'museum', 'quiet', 'lunch', 'nature', 'thanks'],
+                                   known_words={'quite', 'bunch', 'mature', 'tanks'})
+
+    def test_corrects_misspelled_keywords(self):
+        self.assertEqual(self.index.correct_token('restaurent'), 'restaurant')
+        self.assertEqual(self.index.correct_token('musuem'), 'museum')
+
+    def test_keeps_real_words(self):
+        for word in ['quite', 'bunch', 'mature', 'tanks']:
+            self.assertIsNone(self.index.correct_token(word), word)
+
+    def test_short_tokens_are_left_alone(self):
+        self.assertIsNone(self.index.correct_token('lnch'))
+
+    def test_edit_distance_counts_transpositions_once(self):
+        self.assertEqual(SpellingIndex.edit_distance('musuem', 'museum'), 1)
+        self.assertEqual(SpellingIndex.edit_distance('restaurent', 'restaurant'), 1)
+
+
+class MessageSpellingTests(TestCase):
+    def parse(self, message: str):
+        message = MessageProcessor.correct_spelling(MessageProcessor.clean_message(message))
+        return message, ChatbotMessageAPIView()._detect_stage(message)
+
+    def test_misspelled_keywords_reach_their_handler(self):
+        message, (stage, params) = self.parse("any good restaurent")
+        self.assertEqual(message, "any good restaurant")
+        self.assertEqual((stage, params["category"]), ("category", "restaurant"))
+
+        message, (stage, params) = self.parse("musuem")
+        self.assertEqual(message, "museum")
+        self.assertEqual((stage, params["category"]), ("category", "museum"))
+
+    def test_english_words_are_not_rewritten_into_keywords(self):
+        for message in ["its quite far", "a bunch of places", "something mature", "tanks a lot"]:
+            corrected, (stage, params) = self.parse(message)
+            self.assertEqual(corrected, message)
+            self.assertEqual(stage, "faq", message)
+
+
+class MessageStreamTests(TestCase):
+    url = '/api/chatbot/message/stream/'
+
+    def setUp(self):
+        patcher = mock.patch.object(QueryLogWriter, 'record')
+        self.record = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def events(self, body) -> list:
+        response = self.client.post(self.url, json.dumps(body), content_type='application/json',
+                                    HTTP_ACCEPT='application/x-ndjson')
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_places_are_sent_before_the_reply(self):
+        Place.objects.create(name="Gulshan Park", latitude=23.7925, longitude=90.4074, category="Park")
+        Place.objects.create(name="Ramna Park", latitude=23.7386, longitude=90.4072, category="Park")
+
+        events = self.events({"message": "find parks", "latitude": 23.79, "longitude": 90.40})
+        self.assertEqual([e["event"] for e in events], ["intent", "place", "place", "reply", "done"])
+        self.assertEqual([e["data"]["rank"] for e in events[1:3]], [1, 2])
+        self.assertEqual(events[3]["data"]["type"], "category_places")
+        self.assertNotIn("places", events[3]["data"])
+
+    @override_settings(CHATBOT_SHARDING=True)
+    def test_sharded_category_search(self):
+        self.test_places_are_sent_before_the_reply()
+
+    def test_non_object_body_is_handled(self):
+        events = self.events(["x"])
+        self.assertEqual(events, [{"event": "reply", "data": {
+            "type": "error", "reply": "Sorry, I encountered an error. Please try again."
+        }}])
+
+    def test_streamed_messages_are_logged_when_the_stream_ends(self):
+        self.events({"message": "zzz"})
+        self.assertEqual(self.record.call_count, 1)
+        message, stage, response_type, status_code, latency_ms = self.record.call_args.args
+        self.assertEqual((message, stage, response_type, status_code), ("zzz", "faq", "fallback", 200))
+        self.assertGreater(latency_ms, 0)
+
+
+class StreamProfilingTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(QueryLogWriter, 'record')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(CHATBOT_PROFILE_TOKEN='secret', CHATBOT_PROFILE_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_stream_is_profiled_while_it_is_consumed(self):
+        response = self.client.post('/api/chatbot/message/stream/', json.dumps({"message": "zzz"}),
+                                    content_type='application/json', HTTP_X_CHATBOT_PROFILE='secret')
+        self.assertEqual(ProfileStore.list(), [])
+        b''.join(response.streaming_content)
+        response.close()
+
+        [metadata] = ProfileStore.list()
+        self.assertTrue(metadata["streaming"])
+        self.assertEqual(metadata["message_type"], "fallback")
+        stats = pstats.Stats(str(ProfileStore.path_for(metadata["id"])))
+        self.assertIn("_dispatch", {name for _, _, name in stats.stats})
+
+
+@override_settings(CHATBOT_VERSION_CHECK_INTERVAL=0)
+class DataVersionTests(TestCase):
+    def test_bump_is_seen_by_other_workers(self):
+        writer, reader = DataVersion("test"), DataVersion("test")  # one per worker process
+        before = reader.current()
+        self.assertEqual(writer.current(), before)
+        after = writer.bump()
+        self.assertGreater(after, before)
+        self.assertEqual(reader.current(), after)
+
+    def test_faq_changes_in_another_worker_drop_cached_plans(self):
+        QueryPlanCache.get("hello")
+        QueryPlanCache.put("hello", QueryPlan("hello", "faq", {}))
+        self.assertIsNotNone(QueryPlanCache.get("hello"))
+        DataVersion("chatbot").bump()  # what QueryPlanCache.invalidate does in the other worker
+        self.assertIsNone(QueryPlanCache.get("hello"))
+
+
+@override_settings(CHATBOT_VERSION_CHECK_INTERVAL=0)
+class NearestPlacesCachingTests(TestCase):
+    url = '/api/chatbot/nearest-places/?latitude=23.79&longitude=90.407&limit=5'
+
+    def setUp(self):
+        Place.objects.create(name="Gulshan Park", latitude=23.7925, longitude=90.4074, category="Park")
+
+    def test_conditional_get_until_a_place_changes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Place.objects.create(name="Ramna Park", latitude=23.7386, longitude=90.4072, category="Park")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()["total_found"], 2)
+
+    def test_post_reports_the_cell_distances_are_measured_from(self):
+        response = self.client.post('/api/chatbot/nearest-places/', {"latitude": 23.79012, "longitude": 90.40687},
+                                    content_type='application/json')
+        data = response.json()
+        self.assertEqual(data["user_location"], {"latitude": 23.79, "longitude": 90.407})
+        self.assertEqual(data["places"][0]["distance_km"],
+                         round(GeoUtils.haversine(23.79, 90.407, 23.7925, 90.4074), 2))
+
+
+def random_places(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [StoredPlace(i, f"Place {i}", rng.choice(["Park", "Restaurant", "Museum", None]),
+                        rng.uniform(23.0, 24.5), rng.uniform(89.5, 91.5),
+                        rng.choice([None, round(rng.uniform(0, 5), 1)]))
+            for i in range(count)]
+
+
+class RankingTests(SimpleTestCase):
+    """Indexed top-k queries must return what a full scan would"""
+    users = [(23.79, 90.40), (23.0, 89.5), (24.49, 91.49), (22.0, 92.0)]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.places = random_places(500)
+
+    def by_score(self, lat, lon, k, category=None):
+        """Top k scores; compared instead of places since far from the user equal ratings tie"""
+        scores = [RatedPlaceIndex.score(GeoUtils.haversine(lat, lon, p.latitude, p.longitude),
+                                        RatedPlaceIndex.rating_of(p))
+                  for p in self.places if not category or category.lower() in (p.category or '').lower()]
+        return [round(score, 12) for score in sorted(scores, reverse=True)[:k]]
+
+    def by_distance(self, lat, lon, k, category=None):
+        hits = [(GeoUtils.haversine(lat, lon, p.latitude, p.longitude), p.pk)
+                for p in self.places if not category or category.lower() in (p.category or '').lower()]
+        return [pk for dist, pk in sorted(hits)[:k]]
+
+    def test_threshold_algorithm_matches_full_scan(self):
+        index = RatedPlaceIndex(self.places)
+        for lat, lon in self.users:
+            for k in (1, 5, 20):
+                self.assertEqual([round(score, 12) for score, _, _ in index.top_k(lat, lon, k)],
+                                 self.by_score(lat, lon, k))
+
+    def test_sharded_queries_match_full_scan(self):
+        router = ShardRouter(self.places, precision=3)
+        self.assertGreater(len(router.shards), 1)
+        for lat, lon in self.users:
+            for category in (None, "park"):
+                self.assertEqual([p.pk for _, p in router.top_k(lat, lon, 10, category)],
+                                 self.by_distance(lat, lon, 10, category))
+                self.assertEqual([round(score, 12) for score, _, _ in router.top_k_by_score(lat, lon, 10, category)],
+                                 self.by_score(lat, lon, 10, category))
+
+    def test_shard_workers_match_in_process_queries(self):
+        router = ShardRouter(self.places, precision=3, workers=2)
+        self.addCleanup(router.close)
+        self.assertEqual([round(score, 12) for score, _, _ in router.top_k_by_score(23.79, 90.40, 10)],
+                         self.by_score(23.79, 90.40, 10))
+        self.assertEqual([p.pk for _, p in router.top_k(23.79, 90.40, 10)], self.by_distance(23.79, 90.40, 10))
+
+    def test_concurrent_queries_over_shard_workers(self):
+        router = ShardRouter(random_places(2000), precision=3, workers=2)
+        self.addCleanup(router.close)
+        errors = []
+
+        def run(seed: int) -> None:
+            # Different locations send their waves to the workers in different orders
+            rng = random.Random(seed)
+            try:
+                for _ in range(30):
+                    router.top_k(rng.uniform(23.0, 24.5), rng.uniform(89.5, 91.5), 10)
+                    router.top_k_by_score(rng.uniform(23.0, 24.5), rng.uniform(89.5, 91.5), 10)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(seed,), daemon=True) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 30
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self.assertFalse(any(thread.is_alive() for thread in threads), "shard queries deadlocked")
+        self.assertEqual(errors, [])
+
+
+class ClusterIndexTests(SimpleTestCase):
+    world = (-180.0, -85.0, 180.0, 85.0)
+
+    def test_every_zoom_accounts_for_every_place(self):
+        places = random_places(300)
+        index = ClusterIndex(places, max_zoom=12)
+        for zoom in range(0, 14):
+            items = index.query(self.world, zoom)
+            self.assertEqual(sum(item["count"] for item in items), len(places), zoom)
+        self.assertEqual({item["id"] for item in index.query(self.world, 13)}, {p.pk for p in places})
+
+    def test_responses_are_bounded_whatever_the_zoom(self):
+        places = random_places(3000) + [StoredPlace(5000 + i, "Stall", None, 23.8, 90.4, None) for i in range(50)]
+        index = ClusterIndex(places, max_zoom=16)
+        for bbox, zoom in [(self.world, 20), (self.world, 16), ((89.5, 23.0, 91.5, 24.5), 14), (self.world, 0)]:
+            items = index.query(bbox, zoom, max_items=100)
+            self.assertLessEqual(len(items), 100, (bbox, zoom))
+            self.assertEqual(sum(item["count"] for item in items), len(places), (bbox, zoom))
+
+        # Too many places at one spot to list: clustered even past the maximum zoom
+        items = index.query((90.3999, 23.7999, 90.4001, 23.8001), 20, max_items=10)
+        self.assertEqual([(item["type"], item["count"]) for item in items], [("cluster", 50)])
+
+    def test_viewport_crossing_the_antimeridian(self):
+        places = [StoredPlace(1, "East", "Park", -17.7, 179.9, None),
+                  StoredPlace(2, "West", "Park", -17.7, -179.9, None),
+                  StoredPlace(3, "Elsewhere", "Park", -17.7, 0.0, None)]
+        index = ClusterIndex(places, max_zoom=4)
+        items = index.query((179.0, -18.0, -179.0, -17.0), 5)
+        self.assertEqual(sorted(item["id"] for item in items), [1, 2])
+        self.assertEqual(sum(item["count"] for item in index.query((170.0, -20.0, -170.0, -15.0), 2)), 2)
+
+
+class PlaceStoreTests(SimpleTestCase):
+    def test_export_round_trip(self):
+        places = random_places(200) + [StoredPlace(999, "Café Ñandú", None, -33.9, 151.2, None)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/places.bin"
+            self.assertEqual(PlaceStoreWriter.export(places, path), len(places))
+            store = PlaceStore(path)
+            self.assertEqual(list(store.iter_places()), places)
+            self.assertEqual(list(store.iter_places("PARK")),
+                             [p for p in places if p.category and "park" in p.category.lower()])
+
+
+def square(west: float, south: float, size: float) -> list:
+    return [(west, south), (west + size, south), (west + size, south + size), (west, south + size), (west, south)]
+
+
+class AreaIndexTests(SimpleTestCase):
+    def setUp(self):
+        # A grid of square areas, the first with a hole and the last made of two polygons
+        features = []
+        for i in range(30):
+            west, south = 90.0 + (i % 6) * 0.1, 23.0 + (i // 6) * 0.1
+            coordinates = [square(west, south, 0.08)]
+            if i == 0:
+                coordinates.append(square(west + 0.02, south + 0.02, 0.04))
+            geometry = {"type": "Polygon", "coordinates": coordinates}
+            if i == 29:
+                geometry = {"type": "MultiPolygon", "coordinates": [coordinates, [square(89.0, 22.0, 0.05)]]}
+            features.append({"type": "Feature", "id": f"area-{i}", "geometry": geometry,
+                             "properties": {"name": f"Block {i}", "aliases": [f"b{i}"] if i % 2 else []}})
+        features.append({"type": "Feature", "id": "old", "properties": {"name": "Old Block 1"},
+                         "geometry": {"type": "Polygon", "coordinates": [square(95.0, 20.0, 0.1)]}})
+        self.index = AreaIndex(features)
+
+    def test_locate_matches_a_full_scan(self):
+        rng = random.Random(3)
+        points = [(rng.uniform(21.9, 23.7), rng.uniform(88.9, 90.7)) for _ in range(2000)] + [(23.04, 90.04)]
+        for lat, lon in points:
+            expected = [area.id for area in self.index.areas.values()
+                        if any(_polygon_contains(polygon, lon, lat) for polygon in area.polygons)]
+            area = self.index.locate(lat, lon)
+            self.assertEqual([area.id] if area else [], expected, (lat, lon))
+        self.assertIsNone(self.index.locate(23.04, 90.04))  # inside the hole
+        self.assertEqual(self.index.locate(22.02, 89.02).id, "area-29")
+
+    def test_find_in_message_prefers_longer_names(self):
+        self.assertEqual(self.index.find_in_message("cafes in old block 1 please").id, "old")
+        self.assertEqual(self.index.find_in_message("cafes in block 1").id, "area-1")
+        self.assertEqual(self.index.find_in_message("parks near b3").id, "area-3")
+        self.assertIsNone(self.index.find_in_message("parks near b2"))
+        self.assertIsNone(self.index.find_in_message("block 100"))
+
+
+class BulkRecommendTests(TestCase):
+    def setUp(self):
+        Place.objects.create(name="Gulshan Park", latitude=23.7925, longitude=90.4074, category="Park")
+        Place.objects.create(name="Star Kabab", latitude=23.7461, longitude=90.3742, category="Restaurant")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def run_command(self, name: str, content: str, output: str) -> str:
+        path = f"{self.directory}/{name}"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        call_command('bulk_recommend', path, output=f"{self.directory}/{output}", workers=1, limit=1,
+                     chunk_size=2, stderr=io.StringIO())
+        with open(f"{self.directory}/{output}", encoding='utf-8') as f:
+            return f.read()
+
+    def test_bad_ndjson_lines_become_error_records(self):
+        output = self.run_command('in.ndjson', '\n'.join([
+            '{"id": "a", "lat": 23.79, "lon": 90.40}',
+            '{"id": "b", "lat": ',
+            '[1, 2]',
+            '',
+            '{"id": "c", "lat": 23.75, "lon": 90.37, "category": "restaurant"}',
+            '{"id": "d", "lat": 123, "lon": 90.37}',
+        ]), 'out.ndjson')
+        results = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([result["id"] for result in results], ["a", None, None, "c", "d"])
+        self.assertEqual(results[0]["places"][0]["name"], "Gulshan Park")
+        self.assertTrue(results[1]["error"].startswith("line 2: invalid JSON"))
+        self.assertEqual(results[2]["error"], "line 3: expected a JSON object")
+        self.assertEqual(results[3]["places"][0]["name"], "Star Kabab")
+        self.assertIn("invalid location", results[4]["error"])
+
+    def test_csv_input_and_output(self):
+        output = self.run_command('in.csv', 'id,lat,lon,category\n1,23.79,90.40,\n2,abc,90.40,\n', 'out.csv')
+        rows = list(csv.DictReader(io.StringIO(output)))
+        self.assertEqual([(row["id"], row["rank"], row["name"]) for row in rows],
+                         [("1", "1", "Gulshan Park"), ("2", "", "")])
+        self.assertIn("invalid location", rows[1]["error"])
+
+
+class AreaMessageTests(TestCase):
+    url = '/api/chatbot/message/'
+
+    def setUp(self):
+        patcher = mock.patch.object(QueryLogWriter, 'record')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Place.objects.create(name="Gulshan Park", latitude=23.7925, longitude=90.4074, category="Park")
+        Place.objects.create(name="Banani Lake", latitude=23.7940, longitude=90.4000, category="Park")
+
+    def reply(self, message: str, **location) -> dict:
+        return self.client.post(self.url, {"message": message, **location}, content_type='application/json').json()
+
+    def test_filtered_search_in_an_area(self):
+        data = self.reply("places within 5 km in gulshan", latitude=23.79, longitude=90.40)
+        self.assertEqual(data["type"], "multi_filter_places")
+        self.assertEqual([p["name"] for p in data["places"]], ["Gulshan Park"])
+        self.assertIn("km in Gulshan:", data["reply"])
+
+        data = self.reply("places within 5 km", latitude=23.79, longitude=90.40)
+        self.assertEqual([p["name"] for p in data["places"]], ["Banani Lake", "Gulshan Park"])
+
+    def test_area_places_without_a_location_carry_no_distance(self):
+        data = self.reply("what is there in gulshan")
+        self.assertEqual(data["type"], "area_places")
+        self.assertEqual([(p["name"], p["distance_km"]) for p in data["places"]], [("Gulshan Park", None)])
+        self.assertNotIn("km", data["reply"])
+
+        data = self.reply("what is there in gulshan", latitude=23.79, longitude=90.40)
+        self.assertEqual(data["places"][0]["distance_km"], 0.8)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight("test")
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow(self, result=None, error=None):
+        """A function that blocks until released, counting its calls"""
+        def fn():
+            self.calls += 1
+            self.release.wait(5)
+            if error is not None:
+                raise error
+            return result
+        return fn
+
+    def run_concurrently(self, count: int, fn) -> list:
+        """Outcomes (results or exceptions) of count callers that overlap one slow call"""
+        outcomes = []
+
+        def call():
+            try:
+                outcomes.append(self.flight.do("key", fn))
+            except Exception as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return outcomes
+
+    def test_concurrent_callers_share_one_call(self):
+        outcomes = self.run_concurrently(5, self.slow(result=["shared"]))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(outcomes), 5)
+        self.assertTrue(all(outcome is outcomes[0] for outcome in outcomes))
+
+    def test_errors_reach_every_waiter(self):
+        error = ValueError("boom")
+        outcomes = self.run_concurrently(3, self.slow(error=error))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(outcomes, [error] * 3)
+
+    @override_settings(CHATBOT_SINGLE_FLIGHT_TIMEOUT=0.05)
+    def test_waiter_that_times_out_runs_the_call_itself(self):
+        leader = threading.Thread(target=self.flight.do, args=("key", self.slow(result="leader")))
+        leader.start()
+        self.addCleanup(leader.join, 5)
+        self.addCleanup(self.release.set)
+        time.sleep(0.01)
+        self.assertEqual(self.flight.do("key", lambda: "own"), "own")
+
+    @override_settings(CHATBOT_SINGLE_FLIGHT_SHARED=True)
+    def test_shared_leader_publishes_its_result(self):
+        self.assertIsNone(self.flight.do("key", lambda: None))
+        digest = hashlib.md5(b"key").hexdigest()
+        # Wrapped so that other workers can tell a None result from a miss
+        self.assertEqual(cache.get(f"singleflight_result_test_{digest}"), (None,))
+        self.assertIsNone(cache.get(f"singleflight_lock_test_{digest}"))
+
+    @override_settings(CHATBOT_SINGLE_FLIGHT_SHARED=True)
+    def test_shared_follower_waits_for_another_worker(self):
+        digest = hashlib.md5(b"key").hexdigest()
+        self.assertTrue(cache.add(f"singleflight_lock_test_{digest}", 1))  # held by another worker
+        publisher = threading.Timer(0.1, cache.set, (f"singleflight_result_test_{digest}", ("theirs",)))
+        publisher.start()
+        self.addCleanup(publisher.cancel)
+        self.assertEqual(self.flight.do("key", self.fail), "theirs")
+
+
+class PlaceRendererTests(SimpleTestCase):
+    def payloads(self) -> list:
+        places = [Place(pk=1, name="Gulshan Park", latitude=23.7925, longitude=90.4074, category="Park", rating=4.5),
+                  Place(pk=2, name="Café \"Ñandú\" \u2028 ঢাকা", latitude=-33.9, longitude=151.2,
+                        category=None, rating=None)]
+        return [PlaceFragments.build(place, 1.25, duration_hours=2) for place in places] + \
+            [PlaceFragments.build(places[0], 0.0)]
+
+    def test_spliced_output_matches_the_json_renderer(self):
+        data = {"type": "category_places", "places": self.payloads(), "reply": "Here — 🔹 places",
+                "user_location": {"latitude": 23.79, "longitude": 90.4}, "total_found": 3}
+        self.assertEqual(PlaceJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(PlaceJSONRenderer().render({"places": []}), JSONRenderer().render({"places": []}))
+
+    def test_payloads_survive_a_cache_round_trip(self):
+        for payload in self.payloads():
+            restored = pickle.loads(pickle.dumps(payload))
+            self.assertIsInstance(restored, PlacePayload)
+            self.assertEqual(restored, payload)
+            self.assertEqual(restored.encode(), payload.encode())
+            self.assertEqual(json.loads(restored.encode()), dict(payload))
+
+
+class QueryLogWriterTests(TestCase):
+    def setUp(self):
+        # A flusher that has already stopped: rows stay queued until flush() writes them from this thread
+        stopped = threading.Thread(target=lambda: None)
+        stopped.start()
+        stopped.join()
+        patcher = mock.patch.multiple(QueryLogWriter, _queue=queue.Queue(maxsize=4), _thread=stopped,
+                                      _pid=os.getpid(), dropped=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rows_are_queued_then_written_together(self):
+        QueryLogWriter.record("find parks", "category", "category_places", 200, 12.34567)
+        QueryLogWriter.record("x" * 600, None, "error", 500, 1.0)
+        self.assertEqual(QueryLog.objects.count(), 0)
+
+        with mock.patch.object(QueryLog.objects, 'bulk_create', wraps=QueryLog.objects.bulk_create) as bulk_create:
+            QueryLogWriter.flush()
+        self.assertEqual(bulk_create.call_count, 1)
+        rows = list(QueryLog.objects.order_by('id').values_list('message', 'stage', 'response_type',
+                                                                'status_code', 'latency_ms'))
+        self.assertEqual(rows, [("find parks", "category", "category_places", 200, 12.346),
+                                ("x" * 500, None, "error", 500, 1.0)])
+
+    @override_settings(CHATBOT_QUERY_LOG_PRESSURE_SAMPLE=1.0)
+    def test_full_queue_drops_rows(self):
+        for i in range(6):
+            QueryLogWriter.record(f"message {i}", "faq", "fallback", 200, 1.0)
+        self.assertEqual(QueryLogWriter.dropped, 2)
+        QueryLogWriter.flush()
+        self.assertEqual(QueryLog.objects.count(), 4)
+        self.assertEqual(QueryLogWriter.dropped, 0)  # reported and reset by the write
+
+    @override_settings(CHATBOT_QUERY_LOG_PRESSURE_SAMPLE=0.0)
+    def test_rows_are_shed_past_half_full(self):
+        for i in range(4):
+            QueryLogWriter.record(f"message {i}", "faq", "fallback", 200, 1.0)
+        self.assertEqual(QueryLogWriter.dropped, 2)
+
+    @override_settings(CHATBOT_QUERY_LOG=False)
+    def test_disabled_log_records_nothing(self):
+        QueryLogWriter.record("find parks", "category", "category_places", 200, 1.0)
+        self.assertTrue(QueryLogWriter._queue.empty())
+
+
+class QueryLogReportTests(TestCase):
+    def setUp(self):
+        rows = [("ZZZ", "faq", "fallback", 10.0), ("zzz", "faq", "fallback", 30.0), ("qwerty", "faq", "fallback", 20.0),
+                ("hello", "faq", "faq", 40.0), ("find parks", "category", "category_places", 100.0),
+                ("find cafes", "category", "category_places", 300.0), ("[]", None, "error", 5.0)]
+        QueryLog.objects.bulk_create([QueryLog(message=message, stage=stage, response_type=response_type,
+                                               status_code=200, latency_ms=latency)
+                                      for message, stage, response_type, latency in rows])
+        QueryLog.objects.create(message="zzz", stage="faq", response_type="fallback", status_code=200,
+                                latency_ms=1.0, created_at=timezone.now() - timedelta(days=30))
+
+    def report(self, *args) -> list:
+        out = io.StringIO()
+        call_command('query_log_report', *args, stdout=out)
+        return out.getvalue().splitlines()
+
+    def test_report(self):
+        lines = self.report()
+        self.assertEqual(lines[0], "7 messages in the last 7 days")
+        unmatched = lines[lines.index("Top unmatched messages") + 1:lines.index("Slowest stages (latency in ms)") - 1]
+        self.assertEqual([line.split() for line in unmatched], [["2", "zzz"], ["1", "qwerty"]])
+        stages = [line.split() for line in lines[lines.index("Slowest stages (latency in ms)") + 2:]]
+        self.assertEqual(stages, [["category", "2", "200.0", "300.0", "300.0"],
+                                  ["faq", "4", "25.0", "40.0", "40.0"],
+                                  ["-", "1", "5.0", "5.0", "5.0"]])
+
+    def test_top_limits_unmatched_messages(self):
+        lines = self.report('--top', '1', '--days', '60')
+        self.assertEqual(lines[0], "8 messages in the last 60 days")
+        self.assertEqual(lines[lines.index("Top unmatched messages") + 1].split(), ["3", "zzz"])
+        self.assertEqual(lines[lines.index("Top unmatched messages") + 2], "")
@@ -1,7 +1,14 @@
 from django.urls import path
-from .views import NearestPlacesAPIView,ChatbotMessageAPIView
+from .views import (
+    NearestPlacesAPIView, ChatbotMessageAPIView, ChatbotMessageStreamAPIView,
+    PlaceClustersAPIView, ProfileListAPIView, ProfileDownloadAPIView,
+)
 
 urlpatterns = [
     path('nearest-places/', NearestPlacesAPIView.as_view(), name='nearest-places'),
+    path('clusters/', PlaceClustersAPIView.as_view(), name='place-clusters'),
     path('message/', ChatbotMessageAPIView.as_view(), name='chatbot-message'),
+    path('message/stream/', ChatbotMessageStreamAPIView.as_view(), name='chatbot-message-stream'),
+    path('profiles/', ProfileListAPIView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', ProfileDownloadAPIView.as_view(), name='profile-download'),
 ]
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+import threading
+import time
+from .models import DataStamp
+
+
+class DataVersion:
+    """A version stamp in the database that is bumped whenever some data changes.
+
+    Values are nanosecond timestamps of the last change, so they double as a
+    Last-Modified time. The stamp lives in a ``DataStamp`` row rather than the
+    cache, so every worker process sees the same value whatever cache backend
+    is configured. Workers compare it against the one their local caches were
+    built with.
+    Reads are re-checked at most every ``CHATBOT_VERSION_CHECK_INTERVAL``
+    seconds so the common path does not hit the database.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        now = time.monotonic()
+        interval = getattr(settings, 'CHATBOT_VERSION_CHECK_INTERVAL', 1.0)
+        if self._value is not None and now - self._checked_at < interval:
+            return self._value
+        with self._lock:
+            value = DataStamp.objects.filter(name=self.name).values_list('value', flat=True).first()
+            if value is None:
+                # First use: start from a fresh, unique value
+                value = DataStamp.objects.get_or_create(name=self.name, defaults={'value': time.time_ns()})[0].value
+            self._value = value
+            self._checked_at = now
+            return value
+
+    def bump(self) -> int:
+        with self._lock:
+            # Strictly increasing even if two bumps land in the same nanosecond
+            updated = DataStamp.objects.filter(name=self.name).update(
+                value=Greatest(F('value') + 1, Value(time.time_ns()))
+            )
+            if not updated:
+                DataStamp.objects.get_or_create(name=self.name, defaults={'value': time.time_ns()})
+            self._value = DataStamp.objects.values_list('value', flat=True).get(name=self.name)
+            self._checked_at = time.monotonic()
+            return self._value
+
+
+# Bumped on every Place save/delete; used for HTTP validators on place responses
+PLACES_VERSION = DataVersion("places")
@@ -1,34 +1,37 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
+from django.conf import settings
 from django.core.cache import cache
+from django.http import FileResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
 from .models import Place, FAQ
-from math import radians, cos, sin, asin, sqrt
+from .geo import GeoUtils
+from .spelling import SpellingIndex, load_frequency_dictionary
+from .renderers import EventStreamRenderer, NDJSONRenderer
+from .coalescing import SingleFlight
+from .profiling import ProfileStore, ProfilingMixin
+from .serializers import PlaceFragments, PlaceJSONRenderer
+from .place_store import PlaceStore
+from .sharding import ShardRouter
+from .ranking import RatedPlaceIndex
+from .clustering import ClusterIndex
+from .areas import AreaIndex
+from .query_plan import QueryPlan, QueryPlanCache
+from .versioning import PLACES_VERSION
+from .query_log import QueryLogWriter
 import difflib
+import hashlib
 import re
+import time
 import logging
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, Iterable, List, Tuple, Optional, Any
 
 logger = logging.getLogger(__name__)
 
-class GeoUtils:
-    """Utility class for geographical calculations"""
-    
-    @staticmethod
-    def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate the great circle distance between two points on Earth"""
-        try:
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1 
-            dlon = lon2 - lon1 
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            c = 2 * asin(sqrt(a))
-            r = 6371  # Earth's radius in kilometers
-            return c * r
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error calculating distance: {e}")
-            return float('inf')
-
 class ChatbotConfig:
     """Configuration class for chatbot intents, categories, and responses"""
     
@@ -100,9 +103,60 @@ class ChatbotConfig:
         'peaceful': 'quiet'
     }
 
+    LOCATION_KEYWORDS = ['nearest', 'nearby', 'closest', 'near me', 'nearby me',
+                         'suggest', 'visit', 'visiting', 'recommend', 'show me']
+
+    OPEN_HOURS_PHRASES = ['open now', 'open at', 'open today', 'opening hours']
+
+    TRAVEL_MODE_PHRASES = ['by car', 'by bike', 'by walk', 'walking distance', 'driving', 'cycling']
+
+    @classmethod
+    def changed(cls) -> None:
+        """Call after editing the keyword tables at runtime to drop derived caches"""
+        MessageProcessor._spelling_index = None
+        QueryPlanCache.invalidate()
+    
+    @classmethod
+    def vocabulary(cls) -> List[str]:
+        """All single words the chatbot knows, used to build the spelling index"""
+        phrases = []
+        for data in cls.INTENTS.values():
+            phrases.extend(data['keywords'])
+        for keywords in cls.CATEGORIES.values():
+            phrases.extend(keywords)
+        phrases.extend(cls.CATEGORIES.keys())
+        phrases.extend(cls.MOODS.keys())
+        phrases.extend(cls.LOCATION_KEYWORDS)
+        phrases.extend(cls.OPEN_HOURS_PHRASES)
+        phrases.extend(cls.TRAVEL_MODE_PHRASES)
+        return [word for phrase in phrases for word in phrase.split()]
+
 class MessageProcessor:
     """Handles message processing and intent detection"""
     
+    _spelling_index: Optional[SpellingIndex] = None
+    _spelling_areas: Optional[AreaIndex] = None
+
+    @classmethod
+    def get_spelling_index(cls) -> SpellingIndex:
+        """Build the spelling index over the chatbot vocabulary and area names once per process"""
+        areas = AreaIndex.current()
+        if cls._spelling_index is None or cls._spelling_areas is not areas:
+            vocabulary = ChatbotConfig.vocabulary() + (areas.vocabulary() if areas else [])
+            # Only tokens that are not English words get corrected
+            path = getattr(settings, 'CHATBOT_SPELLING_DICTIONARY', None)
+            english = load_frequency_dictionary(str(path)) if path else frozenset()
+            cls._spelling_index = SpellingIndex(vocabulary, known_words=english)
+            cls._spelling_areas = areas
+        return cls._spelling_index
+
+    @classmethod
+    def correct_spelling(cls, message: str) -> str:
+        """Replace misspelled tokens with their closest known keyword"""
+        if not message:
+            return message
+        return cls.get_spelling_index().correct(message)
+
     @staticmethod
     def clean_message(message: str) -> str:
         """Clean and normalize the input message"""
@@ -182,80 +236,220 @@ class LocationValidator:
 class PlaceService:
     """Service class for place-related operations"""
     
+    # Concurrent identical queries from the same cell wait on a single computation
+    _ranking_flight = SingleFlight("places")
+    
     @staticmethod
-    def get_places_by_category(user_lat: float, user_lon: float, category: str, limit: int = 5) -> List[Dict]:
-        """Get places filtered by category and sorted by distance"""
-        cache_key = f"places_category_{category}_{user_lat}_{user_lon}_{limit}"
-        cached_result = cache.get(cache_key)
-        
-        if cached_result:
-            return cached_result
-        
-        places = Place.objects.filter(category__icontains=category)
-        matched_places = []
-        
-        for place in places:
-            try:
-                dist_km = GeoUtils.haversine(user_lat, user_lon, place.latitude, place.longitude)
-                matched_places.append({
-                    "name": place.name,
-                    "category": place.category or "General",
-                    "distance_km": round(dist_km, 2),
-                    "latitude": place.latitude,
-                    "longitude": place.longitude,
-                    "description": getattr(place, 'description', ''),
-                    "rating": getattr(place, 'rating', None)
-                })
-            except Exception as e:
-                logger.error(f"Error processing place {place.name}: {e}")
-                continue
-        
-        matched_places.sort(key=lambda x: x['distance_km'])
-        result = matched_places[:limit]
+    def candidate_places(category: Optional[str] = None, area: Optional[str] = None) -> Iterable:
+        """Places to rank, read from the memory-mapped store when one is configured"""
+        store = PlaceStore.current()
+        if store is not None:
+            places = store.iter_places(category)
+        elif category:
+            places = Place.objects.filter(category__icontains=category)
+        else:
+            places = Place.objects.all()
+        if not area:
+            return places
         
-        # Cache for 10 minutes
-        cache.set(cache_key, result, 600)
-        return result
-
+        # Restrict to the area's polygon; the database pre-filters on its bounding box
+        areas = AreaIndex.current()
+        if areas is None or area not in areas.areas:
+            return []
+        min_lon, min_lat, max_lon, max_lat = areas.areas[area].bbox
+        if store is None:
+            places = places.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        return [place for place in places if areas.contains(area, place.latitude, place.longitude)]
+    
     @staticmethod
-    def get_filtered_places(user_lat: float, user_lon: float, hours: Optional[int] = None, 
-                           max_distance: Optional[float] = None, limit: int = 5) -> List[Dict]:
-        """Get places filtered by time and distance constraints"""
-        places = Place.objects.all()
-        filtered_places = []
+    def places_version() -> int:
+        """Version of the places shared by all workers: the store's export stamp or the database version"""
+        store = PlaceStore.current()
+        return store.stamp if store else PLACES_VERSION.current()
+    
+    @staticmethod
+    def source_version() -> Tuple:
+        """Identity of the place and area data that in-process indexes are built from"""
+        return PlaceService.places_version(), AreaIndex.stamp()
+    
+    @staticmethod
+    def rank_places(user_lat: float, user_lon: float, limit: int, category: Optional[str] = None,
+                    max_distance: Optional[float] = None, hours: Optional[int] = None,
+                    area: Optional[str] = None) -> List[Tuple[float, Any]]:
+        """Nearest (distance, place) pairs matching the filters, closest first"""
+        if area is None:
+            router = ShardRouter.current(PlaceService.places_version(), PlaceService.candidate_places)
+            if router is not None:
+                return router.top_k(user_lat, user_lon, limit, category, max_distance, hours)
         
-        for place in places:
+        # An area holds few enough places to scan them directly
+        places_with_distance = []
+        for place in PlaceService.candidate_places(category, area):
             try:
-                dist_km = GeoUtils.haversine(user_lat, user_lon, place.latitude, place.longitude)
-                duration = getattr(place, 'average_duration', 1)
+                dist = GeoUtils.haversine(user_lat, user_lon, place.latitude, place.longitude)
                 
                 # Apply filters
-                if hours is not None and duration > hours:
+                if hours is not None and getattr(place, 'average_duration', 1) > hours:
                     continue
-                if max_distance is not None and dist_km > max_distance:
+                if max_distance is not None and dist > max_distance:
                     continue
                 
-                filtered_places.append({
-                    "name": place.name,
-                    "category": place.category or "General",
-                    "distance_km": round(dist_km, 2),
-                    "duration_hours": duration,
-                    "latitude": place.latitude,
-                    "longitude": place.longitude,
-                    "description": getattr(place, 'description', ''),
-                    "rating": getattr(place, 'rating', None)
-                })
+                places_with_distance.append((dist, place))
             except Exception as e:
-                logger.error(f"Error processing place {place.name}: {e}")
+                logger.error(f"Error calculating distance for place {place.name}: {e}")
                 continue
         
-        filtered_places.sort(key=lambda x: x['distance_km'])
-        return filtered_places[:limit]
+        places_with_distance.sort(key=lambda x: x[0])
+        return places_with_distance[:limit]
+    
+    @staticmethod
+    def rank_places_by_score(user_lat: float, user_lon: float, limit: int, category: Optional[str] = None,
+                             area: Optional[str] = None) -> List[Tuple[float, float, Any]]:
+        """Best (score, distance, place) triples by distance decay and rating"""
+        if area is None:
+            router = ShardRouter.current(PlaceService.places_version(), PlaceService.candidate_places)
+            if router is not None:
+                return router.top_k_by_score(user_lat, user_lon, limit, category)
+        
+        index = RatedPlaceIndex.current(PlaceService.source_version(), PlaceService.candidate_places,
+                                        category, area)
+        return index.top_k(user_lat, user_lon, limit)
+    
+    @staticmethod
+    def get_places_by_category(user_lat: float, user_lon: float, category: str, limit: int = 5,
+                               area: Optional[str] = None) -> List[Dict]:
+        """Get places filtered by category (and optionally area) and sorted by distance"""
+        user_lat, user_lon = GeoUtils.snap_to_cell(user_lat, user_lon)
+        # Entries are partitioned by the requested area, or else the area the user is in;
+        # the data version in the key retires them when places change in any worker
+        if area is None:
+            areas = AreaIndex.current()
+            partition = f"near_{areas.area_id(user_lat, user_lon) if areas else None}"
+        else:
+            partition = f"in_{area}"
+        cache_key = (f"places_category_{PlaceService.places_version()}_{partition}_{category}_"
+                     f"{user_lat}_{user_lon}_{limit}").replace(' ', '_')
+        cached_result = cache.get(cache_key)
+        
+        if cached_result:
+            return cached_result
+        
+        def compute() -> List[Dict]:
+            result = [PlaceFragments.build(place, round(dist, 2))
+                      for score, dist, place in PlaceService.rank_places_by_score(user_lat, user_lon, limit,
+                                                                                  category, area)]
+            
+            # Cache for 10 minutes
+            cache.set(cache_key, result, 600)
+            return result
+        
+        return PlaceService._ranking_flight.do(cache_key, compute)
+
+    @staticmethod
+    def get_filtered_places(user_lat: float, user_lon: float, hours: Optional[int] = None, 
+                           max_distance: Optional[float] = None, limit: int = 5,
+                           area: Optional[str] = None) -> List[Dict]:
+        """Get places filtered by time and distance constraints (and optionally area)"""
+        user_lat, user_lon = GeoUtils.snap_to_cell(user_lat, user_lon)
+        flight_key = f"filtered_{hours}_{max_distance}_{area}_{user_lat}_{user_lon}_{limit}"
+        
+        def compute() -> List[Dict]:
+            ranked = PlaceService.rank_places(user_lat, user_lon, limit, max_distance=max_distance, hours=hours,
+                                              area=area)
+            return [PlaceFragments.build(place, round(dist, 2),
+                                         duration_hours=getattr(place, 'average_duration', 1))
+                    for dist, place in ranked]
+        
+        return PlaceService._ranking_flight.do(flight_key, compute)
 
-class ChatbotMessageAPIView(APIView):
+    @staticmethod
+    def get_nearest_places(user_lat: float, user_lon: float, limit: int = 5) -> List[Dict]:
+        """Get the nearest places of any category sorted by distance"""
+        user_lat, user_lon = GeoUtils.snap_to_cell(user_lat, user_lon)
+        flight_key = f"nearest_{user_lat}_{user_lon}_{limit}"
+        
+        def compute() -> List[Dict]:
+            return [PlaceFragments.build(place, round(dist, 2))
+                    for dist, place in PlaceService.rank_places(user_lat, user_lon, limit)]
+        
+        return PlaceService._ranking_flight.do(flight_key, compute)
+
+    @staticmethod
+    def get_recommended_places(user_lat: float, user_lon: float, limit: int = 5,
+                               area: Optional[str] = None) -> List[Dict]:
+        """Get the best places of any category (optionally in an area) by distance and rating"""
+        user_lat, user_lon = GeoUtils.snap_to_cell(user_lat, user_lon)
+        flight_key = f"recommended_{area}_{user_lat}_{user_lon}_{limit}"
+        
+        def compute() -> List[Dict]:
+            return [PlaceFragments.build(place, round(dist, 2))
+                    for score, dist, place in PlaceService.rank_places_by_score(user_lat, user_lon, limit,
+                                                                                area=area)]
+        
+        return PlaceService._ranking_flight.do(flight_key, compute)
+    
+    @staticmethod
+    def get_map_clusters(bbox: Tuple[float, float, float, float], zoom: int) -> List[Dict]:
+        """Pre-aggregated clusters (or single places at high zoom) inside a viewport"""
+        index = ClusterIndex.current(PlaceService.places_version(), PlaceService.candidate_places)
+        return index.query(bbox, zoom, getattr(settings, 'CHATBOT_CLUSTERS_MAX_ITEMS', 2000))
+    
+    @staticmethod
+    def http_validators(*key: Any) -> Tuple[str, int]:
+        """ETag and Last-Modified (epoch seconds) for a response derived from places.
+
+        Both come from the database-backed places version (or the place store
+        stamp), so every worker hands out the same validators for the same data.
+        """
+        store = PlaceStore.current()
+        data_version = max(PLACES_VERSION.current(), store.stamp if store else 0)
+        digest = hashlib.md5(":".join(map(str, (data_version,) + key)).encode()).hexdigest()
+        return f'"{digest}"', data_version // 1_000_000_000
+
+
+class FAQService:
+    """Service class for FAQ lookups"""
+    
+    _match_flight = SingleFlight("faq")
+    
+    @staticmethod
+    def find_match(message: str) -> Optional[Dict]:
+        """Return the closest FAQ question/answer for a message, if any"""
+        return FAQService._match_flight.do(message, lambda: FAQService._compute_match(message))
+    
+    @staticmethod
+    def _compute_match(message: str) -> Optional[Dict]:
+        try:
+            faqs = FAQ.objects.all()
+            if not faqs.exists():
+                return None
+            
+            faq_questions = [faq.question.lower() for faq in faqs]
+            matches = difflib.get_close_matches(message, faq_questions, n=1, cutoff=0.5)
+            
+            if matches:
+                matched_question = matches[0]
+                try:
+                    faq = faqs.get(question__iexact=matched_question)
+                    return {"id": faq.pk, "question": faq.question, "answer": faq.answer}
+                except FAQ.DoesNotExist:
+                    pass
+        except Exception as e:
+            logger.error(f"Error in FAQ matching: {e}")
+        
+        return None
+
+class ChatbotMessageAPIView(ProfilingMixin, APIView):
     """Main chatbot API view handling all message processing"""
+    renderer_classes = [PlaceJSONRenderer, BrowsableAPIRenderer]
+    
+    # Stages answered with a list of ranked places
+    PLACE_STAGES = ("filtered", "location", "category", "mood", "area")
     
     def post(self, request) -> Response:
+        started = time.perf_counter()
+        raw_message = ''
+        plan = None
         try:
             raw_message = request.data.get('message', '')
             user_lat = request.data.get('latitude')
@@ -267,79 +461,217 @@ class ChatbotMessageAPIView(APIView):
                     "reply": "Please send a message to get started!"
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            message = MessageProcessor.clean_message(raw_message)
-            
-            # 1. Check basic intents first
-            intent, reply = MessageProcessor.find_intent(message)
-            if intent:
-                return Response({"type": intent, "reply": reply})
-            
-            # 2. Extract filters for time/distance based queries
-            filters = MessageProcessor.extract_filters(message)
-            
-            if filters.get('hours') or filters.get('max_distance'):
-                return self._handle_filtered_search(message, user_lat, user_lon, filters)
-            
-            # 3. Handle location-based queries
-            if self._is_location_query(message):
-                return self._handle_location_query(message, user_lat, user_lon)
-            
-            # 4. Category detection
-            category_response = self._handle_category_query(message, user_lat, user_lon)
-            if category_response:
-                return category_response
-            
-            # 5. Mood detection
-            mood_response = self._handle_mood_query(message, user_lat, user_lon)
-            if mood_response:
-                return mood_response
-            
-            # 6. Special features placeholders
-            special_response = self._handle_special_queries(message)
-            if special_response:
-                return special_response
-            
-            # 7. FAQ matching
-            faq_response = self._handle_faq_query(message)
-            if faq_response:
-                return faq_response
-            
-            # 8. Fallback response
-            return self._get_fallback_response()
+            plan = self._parse_message(raw_message)
+            response = self._dispatch(plan.stage, plan.params, plan.message, user_lat, user_lon)
             
         except Exception as e:
             logger.error(f"Error in ChatbotMessageAPIView: {e}")
-            return Response({
+            response = Response({
                 "type": "error",
                 "reply": "Sorry, I encountered an error. Please try again."
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        # Queued for the background writer; never blocks on the database
+        if raw_message:
+            QueryLogWriter.record(str(raw_message), plan.stage if plan else None,
+                                  response.data.get("type") if isinstance(response.data, dict) else None,
+                                  response.status_code, (time.perf_counter() - started) * 1000)
+        return response
+    
+    def _parse_message(self, raw_message: str) -> QueryPlan:
+        """Clean, correct and classify a message, reusing plans for repeated phrasings"""
+        key = QueryPlanCache.normalize(raw_message)
+        plan = QueryPlanCache.get(key)
+        if plan is None:
+            message = MessageProcessor.clean_message(raw_message)
+            message = MessageProcessor.correct_spelling(message)
+            stage, params = self._detect_stage(message)
+            plan = QueryPlan(message, stage, params)
+            QueryPlanCache.put(key, plan)
+        return plan
+    
+    def _detect_stage(self, message: str) -> Tuple[str, Dict[str, Any]]:
+        """Decide which handler a message goes to; only the FAQ stage touches the database"""
+        # 1. Check basic intents first
+        intent, reply = MessageProcessor.find_intent(message)
+        if intent:
+            return "intent", {"intent": intent, "reply": reply}
+        
+        # 2. Extract filters for time/distance based queries, restricted to an area if one is named
+        area = self._detect_area(message)
+        filters = MessageProcessor.extract_filters(message)
+        if filters.get('hours') or filters.get('max_distance'):
+            return "filtered", {"filters": filters, "area": area}
+        
+        # 3. Handle location-based queries
+        if self._is_location_query(message):
+            return "location", {"category": self._detect_category(message), "area": area}
+        
+        # 4. Category detection
+        category = self._detect_category(message)
+        if category:
+            return "category", {"category": category, "area": area}
+        
+        # 5. Mood detection
+        mood = self._detect_mood(message)
+        if mood:
+            return "mood", {"mood": mood, "area": area}
+        
+        # 6. Special features placeholders
+        special_type = self._detect_special_query(message)
+        if special_type:
+            return "special", {"type": special_type}
+        
+        # 7. Just an area name, e.g. "what is there in gulshan"
+        if area:
+            return "area", {"area": area}
+        
+        # 8. FAQ matching, then fallback
+        match = FAQService.find_match(message)
+        return "faq", {"faq_id": match["id"] if match else None}
+    
+    def _stage_type(self, stage: str, params: Dict[str, Any]) -> Optional[str]:
+        """Response type a stage will produce, or None if only known after lookup"""
+        if stage == "intent":
+            return params["intent"]
+        if stage == "location":
+            return "category_places" if params["category"] else "nearest_places"
+        if stage == "special":
+            return params["type"]
+        if stage == "area":
+            return "area_places"
+        if stage == "faq":
+            return "faq" if params["faq_id"] else "fallback"
+        return {
+            "filtered": "multi_filter_places",
+            "category": "category_places",
+            "mood": "mood_places",
+        }.get(stage)
+    
+    def _dispatch(self, stage: str, params: Dict[str, Any], message: str, user_lat: Any, user_lon: Any) -> Response:
+        """Run the handler for a detected stage"""
+        if stage == "intent":
+            return Response({"type": params["intent"], "reply": params["reply"]})
+        if stage in self.PLACE_STAGES:
+            error, places, location = self._find_places(stage, params, user_lat, user_lon)
+            if error is not None:
+                return error
+            return self._places_reply(stage, params, places, location)
+        if stage == "special":
+            return self._handle_special_query(params["type"])
+        
+        faq_response = self._handle_faq_query(params["faq_id"])
+        if faq_response:
+            return faq_response
+        
+        # 9. Fallback response
+        return self._get_fallback_response()
+    
+    def _detect_category(self, message: str) -> Optional[str]:
+        """Return the first category whose keywords appear in the message"""
+        for category, keywords in ChatbotConfig.CATEGORIES.items():
+            if any(word in message for word in keywords):
+                return category
+        return None
+    
+    def _detect_mood(self, message: str) -> Optional[str]:
+        """Return the first mood keyword that appears in the message"""
+        for mood_key in ChatbotConfig.MOODS:
+            if mood_key in message:
+                return mood_key
+        return None
     
     def _is_location_query(self, message: str) -> bool:
         """Check if the message is asking for location-based recommendations"""
-        location_keywords = ['nearest', 'nearby', 'closest', 'near me', 'nearby me', 
-                           'suggest', 'visit', 'visiting', 'recommend', 'show me']
-        return any(word in message for word in location_keywords)
+        return any(word in message for word in ChatbotConfig.LOCATION_KEYWORDS)
+    
+    def _detect_area(self, message: str) -> Optional[str]:
+        """Return the id of the first area named in the message"""
+        areas = AreaIndex.current()
+        area = areas.find_in_message(message) if areas else None
+        return area.id if area else None
     
-    def _handle_filtered_search(self, message: str, user_lat: Any, user_lon: Any, filters: Dict) -> Response:
-        """Handle search queries with time/distance filters"""
+    def _area_phrase(self, area: Optional[str], user_lat: float, user_lon: float) -> str:
+        """'in <area>' for a requested area, otherwise 'near you' plus the user's own area if known"""
+        areas = AreaIndex.current()
+        if areas is None:
+            return "near you"
+        if area in areas.areas:
+            return f"in {areas.areas[area].name}"
+        here = areas.locate(user_lat, user_lon)
+        return f"near you in {here.name}" if here else "near you"
+    
+    def _find_places(self, stage: str, params: Dict[str, Any], user_lat: Any,
+                     user_lon: Any) -> Tuple[Optional[Response], List[Dict], Optional[Tuple[float, float, bool]]]:
+        """Validate the location and rank the places for a place stage.
+        
+        Returns (error response, places, (lat, lon, located)). The reply text is
+        built separately by ``_places_reply`` so streams can send places first.
+        """
+        if stage == "area":
+            areas = AreaIndex.current()
+            if areas is None or params["area"] not in areas.areas:
+                return self._get_fallback_response(), [], None
+            
+            # Without a usable location, rank from the middle of the area
+            valid, result = LocationValidator.validate_location(user_lat, user_lon)
+            user_lat, user_lon = result if valid else areas.areas[params["area"]].center
+            places = PlaceService.get_recommended_places(user_lat, user_lon, area=params["area"])
+            if not valid:
+                # Distances from the area's centre would look like distances from the user
+                places = [place.with_extra(distance_km=None) for place in places]
+            return None, places, (user_lat, user_lon, valid)
+        
         valid, result = LocationValidator.validate_location(user_lat, user_lon)
         if not valid:
-            return result
+            return result, [], None
         user_lat, user_lon = result
         
+        if stage == "filtered":
+            filters = params["filters"]
+            places = PlaceService.get_filtered_places(
+                user_lat, user_lon, filters.get('hours'), filters.get('max_distance'), area=params["area"]
+            )[:5]
+        elif stage == "mood":
+            mood_category = ChatbotConfig.MOODS[params["mood"]]
+            places = PlaceService.get_places_by_category(user_lat, user_lon, mood_category, area=params["area"])[:5]
+        elif params["category"]:
+            places = PlaceService.get_places_by_category(user_lat, user_lon, params["category"],
+                                                         area=params["area"])[:5]
+        else:
+            places = PlaceService.get_recommended_places(user_lat, user_lon, area=params["area"])
+        return None, places, (user_lat, user_lon, True)
+    
+    def _places_reply(self, stage: str, params: Dict[str, Any], places: List[Dict],
+                      location: Tuple[float, float, bool]) -> Response:
+        """Build the response for places ranked by ``_find_places``"""
+        user_lat, user_lon, located = location
+        if stage == "filtered":
+            return self._filtered_reply(places, params["filters"], user_lat, user_lon, params["area"])
+        if stage == "location":
+            if params["category"]:
+                return self._location_category_reply(places, user_lat, user_lon, params["category"], params["area"])
+            return self._nearest_reply(places, user_lat, user_lon, area=params["area"])
+        if stage == "category":
+            return self._category_reply(places, user_lat, user_lon, params["category"], params["area"])
+        if stage == "mood":
+            return self._mood_reply(places, user_lat, user_lon, params["mood"], params["area"])
+        return self._area_reply(places, params["area"], located)
+    
+    def _filtered_reply(self, filtered_places: List[Dict], filters: Dict, user_lat: float, user_lon: float,
+                        area: Optional[str] = None) -> Response:
+        """Reply for search queries with time/distance filters"""
         hours = filters.get('hours')
         max_distance = filters.get('max_distance')
         
-        filtered_places = PlaceService.get_filtered_places(
-            user_lat, user_lon, hours, max_distance
-        )
-        
         if not filtered_places:
             filter_text = []
             if hours:
                 filter_text.append(f"{hours} hours")
             if max_distance:
                 filter_text.append(f"{max_distance} km")
+            if area:
+                filter_text.append(self._area_phrase(area, user_lat, user_lon))
             
             return Response({
                 "type": "multi_filter_places",
@@ -352,76 +684,45 @@ class ChatbotMessageAPIView(APIView):
             reply_parts.append(f"within {hours} hours")
         if max_distance:
             reply_parts.append(f"within {max_distance} km")
+        where = f" {self._area_phrase(area, user_lat, user_lon)}" if area else ""
         
-        reply_msg = f"Here are some great places {' and '.join(reply_parts)}:\n" + "\n".join(
+        reply_msg = f"Here are some great places {' and '.join(reply_parts)}{where}:\n" + "\n".join(
             [f"🔹 {p['name']} ({p['category']}) - {p['distance_km']} km away, ~{p['duration_hours']}h visit"
-             for i, p in enumerate(filtered_places[:5])]
+             for i, p in enumerate(filtered_places)]
         )
         
         return Response({
             "type": "multi_filter_places", 
-            "places": filtered_places[:5], 
+            "places": filtered_places, 
             "reply": reply_msg
         })
     
-    def _handle_location_query(self, message: str, user_lat: Any, user_lon: Any) -> Response:
-        """Handle general location-based queries"""
-        valid, result = LocationValidator.validate_location(user_lat, user_lon)
-        if not valid:
-            return result
-        user_lat, user_lon = result
-        
-        # Check for specific category in the location query
-        requested_category = None
-        for category, keywords in ChatbotConfig.CATEGORIES.items():
-            if any(word in message for word in keywords):
-                requested_category = category
-                break
-        
-        if requested_category:
-            matched_places = PlaceService.get_places_by_category(user_lat, user_lon, requested_category)
-            if not matched_places:
-                return Response({
-                    "type": "category_places",
-                    "places": [],
-                    "reply": f"Sorry, no {requested_category} places found nearby. Try expanding your search area!"
-                })
-            
-            reply_msg = f"Here are some fantastic {requested_category} places near you:\n" + "\n".join(
-                [f"🔹 {p['name']} ({p['category']}) - {p['distance_km']} km away" 
-                 for p in matched_places[:5]]
-            )
-            
+    def _location_category_reply(self, matched_places: List[Dict], user_lat: float, user_lon: float,
+                                 requested_category: str, area: Optional[str] = None) -> Response:
+        """Reply for location-based queries that name a category"""
+        if not matched_places:
+            where = self._area_phrase(area, user_lat, user_lon) if area else "nearby"
             return Response({
                 "type": "category_places",
-                "places": matched_places[:5],
-                "reply": reply_msg
+                "places": [],
+                "reply": f"Sorry, no {requested_category} places found {where}. Try expanding your search area!"
             })
-        else:
-            # General nearest places query - check if there's any category hint
-            category_hint = None
-            for category, keywords in ChatbotConfig.CATEGORIES.items():
-                if any(word in message for word in keywords):
-                    category_hint = category
-                    break
-            return self._get_nearest_places(user_lat, user_lon, category_hint)
-    
-    def _get_nearest_places(self, user_lat: float, user_lon: float, category_hint: str = None) -> Response:
-        """Get general nearest places without category filter"""
-        places = Place.objects.all()
-        places_with_distance = []
-        
-        for place in places:
-            try:
-                dist = GeoUtils.haversine(user_lat, user_lon, place.latitude, place.longitude)
-                places_with_distance.append((dist, place))
-            except Exception as e:
-                logger.error(f"Error calculating distance for place {place.name}: {e}")
-                continue
         
-        places_with_distance.sort(key=lambda x: x[0])
-        nearest = places_with_distance[:5]
+        reply_msg = (f"Here are some fantastic {requested_category} places "
+                     f"{self._area_phrase(area, user_lat, user_lon)}:\n") + "\n".join(
+            [f"🔹 {p['name']} ({p['category']}) - {p['distance_km']} km away" 
+             for p in matched_places]
+        )
         
+        return Response({
+            "type": "category_places",
+            "places": matched_places,
+            "reply": reply_msg
+        })
+    
+    def _nearest_reply(self, nearest: List[Dict], user_lat: float, user_lon: float, category_hint: str = None,
+                       area: Optional[str] = None) -> Response:
+        """Reply with general nearest places without category filter"""
         if not nearest:
             return Response({
                 "type": "nearest_places", 
@@ -430,138 +731,131 @@ class ChatbotMessageAPIView(APIView):
             })
         
         # Determine if we have a dominant category
-        categories = [place.category or 'General' for dist, place in nearest]
+        categories = [p['category'] for p in nearest]
         category_counts = {}
         for cat in categories:
             category_counts[cat] = category_counts.get(cat, 0) + 1
         
         # If more than half are the same category, use that in the message
         most_common_category = max(category_counts, key=category_counts.get)
+        where = self._area_phrase(area, user_lat, user_lon)
         if category_counts[most_common_category] >= 3 or category_hint:
             category_text = category_hint or most_common_category.lower()
-            reply_msg = f"Here are some amazing {category_text} places near you:\n"
+            reply_msg = f"Here are some amazing {category_text} places {where}:\n"
         else:
-            reply_msg = "Here are some amazing places near you:\n"
+            reply_msg = f"Here are some amazing places {where}:\n"
             
         reply_msg += "\n".join(
-            [f"🔹 {place.name} ({place.category or 'General'}) - {round(dist, 2)} km away"
-             for i, (dist, place) in enumerate(nearest)]
+            [f"🔹 {p['name']} ({p['category']}) - {p['distance_km']} km away"
+             for p in nearest]
         )
         
-        places_data = [{
-            "name": place.name,
-            "category": place.category or "General",
-            "distance_km": round(dist, 2),
-            "latitude": place.latitude,
-            "longitude": place.longitude,
-            "description": getattr(place, 'description', ''),
-            "rating": getattr(place, 'rating', None)
-        } for dist, place in nearest]
-        
         return Response({
             "type": "nearest_places",
-            "places": places_data,
+            "places": nearest,
             "reply": reply_msg
         })
     
-    def _handle_category_query(self, message: str, user_lat: Any, user_lon: Any) -> Optional[Response]:
-        """Handle category-specific queries"""
-        for category, keywords in ChatbotConfig.CATEGORIES.items():
-            if any(word in message for word in keywords):
-                valid, result = LocationValidator.validate_location(user_lat, user_lon)
-                if not valid:
-                    return result
-                user_lat, user_lon = result
-                
-                matched_places = PlaceService.get_places_by_category(user_lat, user_lon, category)
-                if not matched_places:
-                    return Response({
-                        "type": "category_places",
-                        "places": [],
-                        "reply": f"Sorry, no {category} places found near you. Would you like to try a different category?"
-                    })
-                
-                reply_msg = f"Perfect! Here are some great {category} places for you:\n" + "\n".join(
-                    [f"🔹 {p['name']} ({p['category']}) - {p['distance_km']} km away"
-                     for p in matched_places[:5]]
-                )
-                
-                return Response({
-                    "type": "category_places",
-                    "places": matched_places[:5],
-                    "reply": reply_msg
-                })
-        return None
-    
-    def _handle_mood_query(self, message: str, user_lat: Any, user_lon: Any) -> Optional[Response]:
-        """Handle mood-based queries"""
-        for mood_key, mood_category in ChatbotConfig.MOODS.items():
-            if mood_key in message:
-                valid, result = LocationValidator.validate_location(user_lat, user_lon)
-                if not valid:
-                    return result
-                user_lat, user_lon = result
-                
-                mood_places = PlaceService.get_places_by_category(user_lat, user_lon, mood_category)
-                if not mood_places:
-                    return Response({
-                        "type": "mood_places", 
-                        "places": [], 
-                        "reply": f"Sorry, no places found perfect for {mood_key} mood near you. Try a different mood or expand your search area!"
-                    })
-                
-                reply_msg = f"Great choice! Here are some places perfect for a {mood_key} experience:\n" + "\n".join(
-                    [f"🔹 {p['name']} - {p['distance_km']} km away" for p in mood_places[:5]]
-                )
-                
-                return Response({
-                    "type": "mood_places", 
-                    "places": mood_places[:5], 
-                    "reply": reply_msg
-                })
-        return None
+    def _category_reply(self, matched_places: List[Dict], user_lat: float, user_lon: float, category: str,
+                        area: Optional[str] = None) -> Response:
+        """Reply for category-specific queries"""
+        where = self._area_phrase(area, user_lat, user_lon)
+        if not matched_places:
+            return Response({
+                "type": "category_places",
+                "places": [],
+                "reply": f"Sorry, no {category} places found {where}. Would you like to try a different category?"
+            })
+        
+        reply_msg = f"Perfect! Here are some great {category} places {where if area else 'for you'}:\n" + "\n".join(
+            [f"🔹 {p['name']} ({p['category']}) - {p['distance_km']} km away"
+             for p in matched_places]
+        )
+        
+        return Response({
+            "type": "category_places",
+            "places": matched_places,
+            "reply": reply_msg
+        })
     
-    def _handle_special_queries(self, message: str) -> Optional[Response]:
-        """Handle special feature queries (opening hours, travel modes, etc.)"""
-        if any(phrase in message for phrase in ['open now', 'open at', 'open today', 'opening hours']):
+    def _mood_reply(self, mood_places: List[Dict], user_lat: float, user_lon: float, mood_key: str,
+                    area: Optional[str] = None) -> Response:
+        """Reply for mood-based queries"""
+        where = self._area_phrase(area, user_lat, user_lon)
+        if not mood_places:
             return Response({
-                "type": "open_hours", 
-                "reply": "🕒 Opening hours feature is coming soon! We're working on real-time availability data."
+                "type": "mood_places", 
+                "places": [], 
+                "reply": f"Sorry, no places found perfect for {mood_key} mood {where}. Try a different mood or expand your search area!"
             })
         
-        if any(phrase in message for phrase in ['by car', 'by bike', 'by walk', 'walking distance', 'driving', 'cycling']):
+        reply_msg = (f"Great choice! Here are some places perfect for a {mood_key} experience"
+                     f"{' ' + where if area else ''}:\n") + "\n".join(
+            [f"🔹 {p['name']} - {p['distance_km']} km away" for p in mood_places]
+        )
+        
+        return Response({
+            "type": "mood_places", 
+            "places": mood_places, 
+            "reply": reply_msg
+        })
+    
+    def _area_reply(self, area_places: List[Dict], area: str, located: bool) -> Response:
+        """Reply for messages that only name an area; distances only mean something if the user is located"""
+        name = AreaIndex.current().areas[area].name
+        if not area_places:
             return Response({
-                "type": "travel_mode", 
-                "reply": "🚗 Travel mode filtering will be available soon! Currently showing straight-line distances."
+                "type": "area_places",
+                "area": {"id": area, "name": name},
+                "places": [],
+                "reply": f"Sorry, I don't know any places in {name} yet. Try a nearby area!"
             })
         
+        reply_msg = f"Here are some of the best places in {name}:\n" + "\n".join(
+            [f"🔹 {p['name']} ({p['category']})" + (f" - {p['distance_km']} km away" if located else "")
+             for p in area_places]
+        )
+        
+        return Response({
+            "type": "area_places",
+            "area": {"id": area, "name": name},
+            "places": area_places,
+            "reply": reply_msg
+        })
+    
+    def _detect_special_query(self, message: str) -> Optional[str]:
+        """Detect special feature queries (opening hours, travel modes, etc.)"""
+        if any(phrase in message for phrase in ChatbotConfig.OPEN_HOURS_PHRASES):
+            return "open_hours"
+        if any(phrase in message for phrase in ChatbotConfig.TRAVEL_MODE_PHRASES):
+            return "travel_mode"
         return None
     
-    def _handle_faq_query(self, message: str) -> Optional[Response]:
-        """Handle FAQ matching using fuzzy string matching"""
-        try:
-            faqs = FAQ.objects.all()
-            if not faqs.exists():
-                return None
-            
-            faq_questions = [faq.question.lower() for faq in faqs]
-            matches = difflib.get_close_matches(message, faq_questions, n=1, cutoff=0.5)
-            
-            if matches:
-                matched_question = matches[0]
-                try:
-                    faq = faqs.get(question__iexact=matched_question)
-                    return Response({
-                        "type": "faq", 
-                        "question": faq.question,
-                        "reply": faq.answer
-                    })
-                except FAQ.DoesNotExist:
-                    pass
-        except Exception as e:
-            logger.error(f"Error in FAQ matching: {e}")
+    def _handle_special_query(self, special_type: str) -> Response:
+        """Answer special feature placeholders"""
+        if special_type == "open_hours":
+            return Response({
+                "type": "open_hours", 
+                "reply": "🕒 Opening hours feature is coming soon! We're working on real-time availability data."
+            })
         
-        return None
+        return Response({
+            "type": "travel_mode", 
+            "reply": "🚗 Travel mode filtering will be available soon! Currently showing straight-line distances."
+        })
+    
+    def _handle_faq_query(self, faq_id: Optional[int]) -> Optional[Response]:
+        """Answer with the FAQ matched while parsing the message"""
+        if faq_id is None:
+            return None
+        faq = FAQ.objects.filter(pk=faq_id).first()
+        if faq is None:
+            return None
+        return Response({
+            "type": "faq", 
+            "question": faq.question,
+            "reply": faq.answer
+        })
     
     def _get_fallback_response(self) -> Response:
         """Return fallback response when no intent is matched"""
@@ -578,8 +872,136 @@ class ChatbotMessageAPIView(APIView):
         return Response({"type": "fallback", "reply": fallback_reply})
 
 
-class NearestPlacesAPIView(APIView):
-    """Dedicated API view for getting nearest places"""
+class ChatbotMessageStreamAPIView(ChatbotMessageAPIView):
+    """Streaming variant of the message endpoint.
+
+    Emits an ``intent`` event as soon as the message is classified, one ``place``
+    event per ranked place, then the ``reply`` and a final ``done`` event. Clients
+    choose SSE (``Accept: text/event-stream``) or NDJSON (``application/x-ndjson``).
+    """
+    renderer_classes = [EventStreamRenderer, NDJSONRenderer]
+    
+    def post(self, request):
+        started = time.perf_counter()
+        try:
+            raw_message = request.data.get('message', '')
+            user_lat = request.data.get('latitude')
+            user_lon = request.data.get('longitude')
+        except Exception as e:
+            # e.g. a JSON list instead of an object
+            logger.error(f"Error in ChatbotMessageStreamAPIView: {e}")
+            return Response({
+                "type": "error",
+                "reply": "Sorry, I encountered an error. Please try again."
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if not raw_message:
+            return Response({
+                "type": "error", 
+                "reply": "Please send a message to get started!"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        renderer = request.accepted_renderer
+        events = self._event_stream(renderer, raw_message, user_lat, user_lon, started)
+        response = StreamingHttpResponse(events, content_type=f"{renderer.media_type}; charset=utf-8")
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+        return response
+    
+    def _event_stream(self, renderer, raw_message: str, user_lat: Any, user_lon: Any, started: float):
+        """Yield encoded events for one message"""
+        stage = response_type = None
+        status_code = status.HTTP_200_OK
+        try:
+            message, stage, params = self._parse_message(raw_message)
+            yield renderer.format_event('intent', {"stage": stage, "type": self._stage_type(stage, params)})
+            
+            if stage in self.PLACE_STAGES:
+                # Send the places as soon as they are ranked; the reply text comes after
+                response, places, location = self._find_places(stage, params, user_lat, user_lon)
+                if response is None:
+                    for rank, place in enumerate(places, start=1):
+                        yield renderer.format_event('place', dict(place, rank=rank))
+                    response = self._places_reply(stage, params, places, location)
+            else:
+                response = self._dispatch(stage, params, message, user_lat, user_lon)
+            
+            payload = dict(response.data)
+            payload.pop('places', None)
+            payload['status'] = response.status_code
+            response_type, status_code = payload.get('type'), response.status_code
+            yield renderer.format_event('reply', payload)
+        except Exception as e:
+            logger.error(f"Error in ChatbotMessageStreamAPIView: {e}")
+            response_type, status_code = "error", status.HTTP_500_INTERNAL_SERVER_ERROR
+            yield renderer.format_event('reply', {
+                "type": "error",
+                "reply": "Sorry, I encountered an error. Please try again.",
+                "status": status.HTTP_500_INTERNAL_SERVER_ERROR
+            })
+        finally:
+            self.profile_message_type = response_type
+            # Logged when the stream ends, also if the client disconnects part way
+            QueryLogWriter.record(str(raw_message), stage, response_type, status_code,
+                                  (time.perf_counter() - started) * 1000)
+        yield renderer.format_event('done', {})
+
+
+class NearestPlacesAPIView(ProfilingMixin, APIView):
+    """Dedicated API view for getting nearest places.
+
+    GET is the cacheable variant: coordinates are snapped to the grid cell and
+    responses carry ETag/Last-Modified validators plus a public Cache-Control,
+    so repeat map views can be answered by browsers and edge caches.
+    """
+    renderer_classes = [PlaceJSONRenderer, BrowsableAPIRenderer]
+    # Public data; skipping session auth keeps responses free of Vary: Cookie
+    authentication_classes = []
+    
+    def get(self, request):
+        try:
+            user_lat = request.query_params.get('latitude')
+            user_lon = request.query_params.get('longitude')
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 20))  # Max 20 places
+        except (ValueError, TypeError):
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        valid, result = LocationValidator.validate_location(user_lat, user_lon)
+        if not valid:
+            return result
+        cell_lat, cell_lon = GeoUtils.snap_to_cell(*result)
+        
+        # Send clients to the canonical cell URL so caches key on the cell, not raw GPS noise
+        canonical = {"latitude": str(cell_lat), "longitude": str(cell_lon), "limit": str(limit)}
+        if {key: request.query_params.get(key) for key in canonical} != canonical:
+            response = HttpResponseRedirect(f"{request.path}?{urlencode(canonical)}")
+            patch_cache_control(response, public=True, max_age=self._max_age())
+            return response
+        
+        etag, last_modified = PlaceService.http_validators(cell_lat, cell_lon, limit)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            try:
+                data = PlaceService.get_nearest_places(cell_lat, cell_lon, limit)
+            except Exception as e:
+                logger.error(f"Error in NearestPlacesAPIView: {e}")
+                return Response({
+                    "error": "An error occurred while fetching places"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            response = Response({
+                "places": data,
+                "total_found": len(data),
+                "user_location": {"latitude": cell_lat, "longitude": cell_lon}
+            })
+        
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=self._max_age())
+        return response
+    
+    @staticmethod
+    def _max_age() -> int:
+        return getattr(settings, 'CHATBOT_NEAREST_CACHE_MAX_AGE', 300)
     
     def post(self, request) -> Response:
         try:
@@ -590,33 +1012,10 @@ class NearestPlacesAPIView(APIView):
             valid, result = LocationValidator.validate_location(user_lat, user_lon)
             if not valid:
                 return result
-            user_lat, user_lon = result
+            # Distances are measured from the snapped cell, so report the cell as the GET does
+            user_lat, user_lon = GeoUtils.snap_to_cell(*result)
             
-            places = Place.objects.all()
-            places_with_distance = []
-            
-            for place in places:
-                try:
-                    dist = GeoUtils.haversine(user_lat, user_lon, place.latitude, place.longitude)
-                    places_with_distance.append((dist, place))
-                except Exception as e:
-                    logger.error(f"Error calculating distance for place {place.name}: {e}")
-                    continue
-            
-            places_with_distance.sort(key=lambda x: x[0])
-            nearest = places_with_distance[:limit]
-            
-            data = []
-            for dist, place in nearest:
-                data.append({
-                    "name": place.name,
-                    "category": place.category or "General",
-                    "distance_km": round(dist, 2),
-                    "latitude": place.latitude,
-                    "longitude": place.longitude,
-                    "description": getattr(place, 'description', ''),
-                    "rating": getattr(place, 'rating', None)
-                })
+            data = PlaceService.get_nearest_places(user_lat, user_lon, limit)
             
             return Response({
                 "places": data,
@@ -628,4 +1027,77 @@ class NearestPlacesAPIView(APIView):
             logger.error(f"Error in NearestPlacesAPIView: {e}")
             return Response({
                 "error": "An error occurred while fetching places"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PlaceClustersAPIView(APIView):
+    """Map clusters for a viewport.
+
+    GET ?bbox=west,south,east,north&zoom=z returns pre-aggregated clusters
+    (count, centroid, dominant category) from the hierarchical grid index;
+    individual places are only listed once a cell holds a single place or
+    the zoom passes CHATBOT_CLUSTER_MAX_ZOOM. Viewports spanning more than
+    CHATBOT_CLUSTERS_MAX_ITEMS cells are answered at a coarser zoom.
+    """
+    renderer_classes = [PlaceJSONRenderer, BrowsableAPIRenderer]
+    authentication_classes = []
+    
+    MAX_ZOOM = 22
+    
+    def get(self, request):
+        try:
+            west, south, east, north = (float(value) for value in request.query_params.get('bbox', '').split(','))
+            zoom = int(request.query_params.get('zoom', ''))
+        except (ValueError, TypeError):
+            return Response({
+                "error": "bbox (west,south,east,north) and an integer zoom are required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not (-90 <= south <= north <= 90) or not (-180 <= west <= 180 and -180 <= east <= 180):
+            return Response({"error": "Invalid bbox"}, status=status.HTTP_400_BAD_REQUEST)
+        if not (0 <= zoom <= self.MAX_ZOOM):
+            return Response({"error": f"zoom must be between 0 and {self.MAX_ZOOM}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        bbox = (west, south, east, north)
+        
+        etag, last_modified = PlaceService.http_validators(*bbox, zoom)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            try:
+                clusters = PlaceService.get_map_clusters(bbox, zoom)
+            except Exception as e:
+                logger.error(f"Error in PlaceClustersAPIView: {e}")
+                return Response({
+                    "error": "An error occurred while fetching clusters"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            response = Response({
+                "zoom": zoom,
+                "clusters": clusters,
+                "total_places": sum(cluster["count"] for cluster in clusters)
+            })
+        
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True,
+                            max_age=getattr(settings, 'CHATBOT_CLUSTERS_CACHE_MAX_AGE', 300))
+        return response
+
+
+class ProfileListAPIView(APIView):
+    """Admin-only listing of captured request profiles"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request) -> Response:
+        return Response({"profiles": ProfileStore.list()})
+
+
+class ProfileDownloadAPIView(APIView):
+    """Admin-only download of a captured pstats file"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, profile_id: str):
+        path = ProfileStore.path_for(profile_id)
+        if path is None:
+            return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name,
+                            content_type='application/octet-stream')
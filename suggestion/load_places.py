@@ -22,6 +22,7 @@ def load_places():
                 'latitude': place['latitude'],
                 'longitude': place['longitude'],
                 'category': place.get('category', ''),
+                'rating': place.get('rating'),
             }
         )
         if created:
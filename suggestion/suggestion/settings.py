@@ -125,3 +125,69 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Chatbot tuning
+
+# Decimal places user coordinates are rounded to before ranking (3 = ~110 m cells)
+CHATBOT_CELL_PRECISION = 3
+
+# English word list (SymSpell frequency dictionary format) used by the spelling corrector:
+# only tokens missing from it are mapped to chatbot keywords.
+CHATBOT_SPELLING_DICTIONARY = BASE_DIR / 'chatbot' / 'data' / 'frequency_dictionary_en_82_765.txt.gz'
+
+# Coalesce identical concurrent place/FAQ lookups across workers via the cache
+CHATBOT_SINGLE_FLIGHT_SHARED = False
+CHATBOT_SINGLE_FLIGHT_TIMEOUT = 5  # seconds
+
+# Request profiling: send `X-Chatbot-Profile: <token>` or sample a fraction of requests.
+# Profiles are listed/downloaded by admins at /api/chatbot/profiles/.
+CHATBOT_PROFILE_TOKEN = None
+CHATBOT_PROFILE_SAMPLE_RATE = 0.0
+CHATBOT_PROFILE_DIR = BASE_DIR / 'profiles'
+CHATBOT_PROFILE_MAX_FILES = 50
+
+# Memory-mapped place snapshot shared by all workers. Build it with
+# `python manage.py export_place_store`; None reads places from the database.
+CHATBOT_PLACE_STORE = None
+CHATBOT_PLACE_STORE_CHECK_INTERVAL = 1.0  # seconds between checks for a re-export
+
+# Partition places into geohash regions and query only the regions near the user.
+# With CHATBOT_SHARD_WORKERS > 0 the regions are served by that many local processes.
+CHATBOT_SHARDING = False
+CHATBOT_SHARD_PRECISION = 3  # geohash length; 3 = ~156 x 156 km regions
+CHATBOT_SHARD_WORKERS = 0
+
+# Category and chat recommendations rank by a blend of distance and rating:
+# (1 - weight) * exp(-distance_km / decay) + weight * rating / 5
+CHATBOT_RATING_WEIGHT = 0.3
+CHATBOT_DISTANCE_DECAY_KM = 5.0
+CHATBOT_UNRATED_RATING = 2.5  # rating assumed for places without one
+
+# Parsed message plans kept per worker for repeated phrasings
+CHATBOT_PARSE_CACHE_SIZE = 4096
+CHATBOT_VERSION_CHECK_INTERVAL = 1.0  # seconds between database checks of shared data versions
+
+# Cache-Control max-age (seconds) for GET /api/chatbot/nearest-places/
+CHATBOT_NEAREST_CACHE_MAX_AGE = 300
+
+# Map clusters (/api/chatbot/clusters/): grid cells are 256 / 2**GRID_BITS pixels
+# wide at every zoom; above MAX_ZOOM individual places are returned instead.
+CHATBOT_CLUSTER_MAX_ZOOM = 16
+CHATBOT_CLUSTER_GRID_BITS = 2
+CHATBOT_CLUSTERS_CACHE_MAX_AGE = 300  # Cache-Control max-age (seconds) for cluster responses
+# Most items in one response; larger viewports get coarser clusters (~2000 cells of 64 px fill a 4K screen)
+CHATBOT_CLUSTERS_MAX_ITEMS = 2000
+
+# Write-behind query log (chatbot.QueryLog); report with `python manage.py query_log_report`.
+# Past half full, only PRESSURE_SAMPLE of new rows are queued; a full queue drops them.
+CHATBOT_QUERY_LOG = True
+CHATBOT_QUERY_LOG_QUEUE_SIZE = 10000
+CHATBOT_QUERY_LOG_BATCH_SIZE = 200
+CHATBOT_QUERY_LOG_FLUSH_INTERVAL = 2.0  # seconds
+CHATBOT_QUERY_LOG_PRESSURE_SAMPLE = 0.1
+
+# Neighbourhood polygons (GeoJSON) for resolving coordinates and area names in messages.
+# The sample file holds simplified outlines of central Dhaka areas.
+CHATBOT_AREAS_FILE = BASE_DIR / 'chatbot' / 'data' / 'dhaka_areas.geojson'
+CHATBOT_AREAS_CHECK_INTERVAL = 5.0  # seconds between checks for an edited file